@@ -1,21 +1,136 @@
-from fastapi import FastAPI, UploadFile, File, Form,BackgroundTasks
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, UploadFile, File, Form,Query,Request,Response,HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 import shutil
-from RAM_Analysis import RAM_Analysis
 import os
 from pathlib import Path
 import io
-import cv2
+import hashlib
+import uuid
+import logging
+import asyncio
+import functools
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from metrics import metrics
+from analysisConfig import AnalysisConfig, PRESETS
+from outputCatalog import OutputCatalog
 
-app = FastAPI()
 emoticon = ["😊","😡","😎","🐶","👋","🌍"]
 
 UPLOAD_DIR = "uploads"
-OUTPUT_DIR = "..\public\output"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+OUTPUT_DIR = os.path.abspath(os.path.join("..", "public", "output"))
+CACHE_DIR = "cache"
 
-model = RAM_Analysis("merged_classification.csv")
+# RAM_LOG_LEVEL=WARNING silences the progress bars and training/loading messages
+logging.basicConfig(level=os.environ.get("RAM_LOG_LEVEL", "INFO"))
+
+logger = logging.getLogger("API")
+
+# detector/forest settings: RAM_PRESET, RAM_CONFIG (JSON file) and RAM_<FIELD> overrides
+config = AnalysisConfig.load()
+
+# The model (OpenCV, pandas, forest training) is loaded in the background after
+# startup so the server answers immediately; RAM_MODEL_PATH keeps a trained
+# forest on disk across restarts. /readyz reports when it is usable.
+MODEL_PATH = os.environ.get("RAM_MODEL_PATH", os.path.join(CACHE_DIR, "noise_filter.pkl"))
+model = None
+model_error = None
+
+# Listing and serving results only needs the catalog, opened at startup, so
+# those routes work while the model is still loading.
+catalog = None
+
+# Blocking work never runs on the event loop: each resource has its own
+# executor, and the semaphores bound how many requests may queue work on it.
+io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="io")
+decode_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="decode")
+analysis_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+io_slots = asyncio.Semaphore(8)
+decode_slots = asyncio.Semaphore(2)
+jobs = {}
+
+
+async def run_blocking(executor, fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+def write_file(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def merge_chunks(temp_dir: str, filename: str, total_chunks: int, final_path: str):
+    with open(final_path, "wb") as final_file:
+        for i in range(total_chunks):
+            part_path = os.path.join(temp_dir, f"{filename}.part{i}")
+            with open(part_path, "rb") as part_file:
+                shutil.copyfileobj(part_file, final_file, 1024 * 1024)
+            os.remove(part_path)
+
+
+def read_first_frame_jpeg(video_path: str):
+    import cv2
+
+    try:
+        cap = cv2.VideoCapture(video_path)
+        success, frame = cap.read()
+        cap.release()
+    finally:
+        os.remove(video_path)
+
+    if not success:
+        return None
+
+    # Convert frame to JPG in memory
+    _, buffer = cv2.imencode(".jpg", frame)
+    return buffer.tobytes()
+
+
+def load_model():
+    global model, model_error
+    start = time.perf_counter()
+    try:
+        from RAM_Analysis import RAM_Analysis
+        model = RAM_Analysis("merged_classification.csv", output_dir=OUTPUT_DIR, cache_dir=CACHE_DIR, trace_dir=os.environ.get("RAM_TRACE_DIR"), config=config, model_path=MODEL_PATH, catalog=catalog)
+    except Exception as e:
+        model_error = e
+        logger.exception("Model failed to load")
+        return
+    metrics.observe("model_load_seconds", time.perf_counter() - start)
+    logger.info("Model ready in %.1fs", time.perf_counter() - start)
+
+
+def get_model():
+    if model is None:
+        detail = f"Model failed to load: {model_error}" if model_error is not None else "Model is still loading"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
+    return model
+
+
+def run_job(video_path: str, overlay_mask: list[str], job_id: str, job_cfg: AnalysisConfig):
+    # queued behind load_model on the single analysis worker
+    return get_model().process_video(video_path, overlay_mask, job_id=job_id, config=job_cfg)
+
+
+def job_config(preset: str = None, overrides: str = None) -> tuple[AnalysisConfig, dict]:
+    # the preset's forest fields the loaded model cannot honour, reported back to the client
+    try:
+        values = json.loads(overrides) if overrides else {}
+        if not isinstance(values, dict):
+            raise ValueError("config must be a JSON object")
+        return config.for_job(values, preset=preset), config.ignored_fields(preset)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def on_job_done(job_id: str, future):
+    jobs.pop(job_id, None)
+    if future.exception() is not None:
+        logger.error("Job %s failed", job_id, exc_info=future.exception())
 # overlay_mask = [
 #         "0 0.548750 0.060000 0.591250 0.060000 0.583750 0.397778 0.538750 0.400000",
 #         "0 0.592500 0.400000 0.736250 0.177778 0.767500 0.217778 0.617500 0.442222",
@@ -28,6 +143,23 @@ model = RAM_Analysis("merged_classification.csv")
 #     ]
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # nothing touches the disk at import, so --reload and tooling imports stay cheap
+    global catalog
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    catalog = OutputCatalog(os.path.join(CACHE_DIR, "catalog.sqlite3"), OUTPUT_DIR)
+    # first task on the single analysis worker, so uploads queued meanwhile wait for it
+    analysis_executor.submit(load_model)
+    try:
+        yield
+    finally:
+        for executor in (io_executor, decode_executor, analysis_executor):
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(lifespan=lifespan)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -45,83 +177,183 @@ def RandomEmoticon():
 
 @app.get("/getVideoProgress")
 def VideoProgress():
-    return {"progress": model.progress_video}
+    return {"progress": model.progress_video if model is not None else -1, "jobs": len(jobs), "ready": model is not None}
+
+@app.get("/config")
+def Config():
+    return {"config": config.to_dict(), "presets": PRESETS}
+
+@app.get("/healthz")
+def Liveness():
+    return {"status": "alive"}
+
+@app.get("/readyz")
+def Readiness(response: Response):
+    if model is not None:
+        return {"status": "ready", "model_version": model.rf.version}
+    response.status_code = 503
+    if model_error is not None:
+        return {"status": "failed", "error": str(model_error)}
+    return {"status": "loading"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def Metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
 
 
 
 @app.post("/upload_chunk/")
 async def upload_chunk(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     chunk_index: int = Form(...),
     total_chunks: int = Form(...),
     filename: str = Form(...),
-    overlay_mask:str = Form(...)
+    overlay_mask:str = Form(...),
+    preset: str = Form(None),
+    config_json: str = Form(None, alias="config")
 ):
+    # validated on every chunk so a bad config fails before the upload completes
+    job_cfg, ignored = job_config(preset, config_json)
+    if model_error is not None:
+        get_model()
     temp_dir = "temp_chunks"
     os.makedirs(temp_dir, exist_ok=True)
+    filename = os.path.basename(filename)
 
     chunk_path = os.path.join(temp_dir, f"{filename}.part{chunk_index}")
 
-    with open(chunk_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    data = await file.read()
+    async with io_slots:
+        await run_blocking(io_executor, write_file, chunk_path, data)
 
     # ✅ Merge when last chunk arrives
     if chunk_index + 1 == total_chunks:
         final_path = os.path.join(UPLOAD_DIR, filename)
 
-        with open(final_path, "wb") as final_file:
-            for i in range(total_chunks):
-                part_path = os.path.join(temp_dir, f"{filename}.part{i}")
-                with open(part_path, "rb") as part_file:
-                    final_file.write(part_file.read())
-                os.remove(part_path)
+        async with io_slots:
+            await run_blocking(io_executor, merge_chunks, temp_dir, filename, total_chunks, final_path)
 
-        # ✅ Run heavy AI processing in background (NON-BLOCKING)
-        background_tasks.add_task(
-            model.process_video,
+        # ✅ Run heavy AI processing on its own executor (NON-BLOCKING, one video at a time)
+        job_id = uuid.uuid4().hex
+        future = analysis_executor.submit(
+            run_job,
             final_path,
-            overlay_mask.split(";")
+            overlay_mask.split(";"),
+            job_id,
+            job_cfg
         )
+        jobs[job_id] = future
+        future.add_done_callback(functools.partial(on_job_done, job_id))
+
+        return {
+            "status": "processing started",
+            "chunk": chunk_index,
+            "job_id": job_id,
+            "ignored": ignored
+        }
 
     return {
         "status": "chunk received",
-        "chunk": chunk_index
+        "chunk": chunk_index,
+        "ignored": ignored
     }
 
 
 @app.get("/getOutputPath")
-def getOutputPath():
-    FOLDER = "..\public\output"  # change to your folder
-    video_ext = ('.mp4', '.avi', '.mov', '.mkv',".webm")
+def getOutputPath(request: Request, response: Response, offset: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=500), source: str = None, since: float = None):
+    query_key = f"{catalog.version}:{offset}:{limit}:{source}:{since}"
+    etag = f'"{hashlib.sha1(query_key.encode()).hexdigest()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
 
-    video_paths = [
-        os.path.join("output", f)
+    total, items = catalog.query(offset=offset, limit=limit, source=source, since=since)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
 
-        for f in os.listdir(FOLDER)
-        
-        if f.lower().endswith(video_ext)
-    ]
+    return {
+        "paths": [item["path"] for item in items],
+        "items": items,
+        "total": total,
+        "offset": offset,
+        "limit": limit
+    }
 
-    return {"paths":video_paths}
+def file_chunks(path: str, start: int, length: int, chunk_size: int = 1024 * 1024):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def range_file_response(request: Request, path: str, media_type: str):
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Result not found")
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": "public, max-age=86400",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(file_chunks(path, 0, size), media_type=media_type, headers=headers)
+
+    start_str, _, end_str = range_header[len("bytes="):].partition("-")
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+        else:
+            # suffix range: last N bytes
+            start = max(size - int(end_str), 0)
+            end = size - 1
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Range header")
+
+    end = min(end, size - 1)
+    if start > end:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(file_chunks(path, start, end - start + 1), status_code=206, media_type=media_type, headers=headers)
+
+
+@app.get("/results/{video}")
+def stream_result(video: str, request: Request):
+    return range_file_response(request, catalog.video_path(video), "video/webm")
+
+@app.get("/results/{video}/preview")
+def stream_preview(video: str, request: Request):
+    return range_file_response(request, catalog.preview_path(video), "video/webm")
+
+@app.get("/results/{video}/poster")
+def get_poster(video: str, request: Request):
+    return range_file_response(request, catalog.poster_path(video), "image/jpeg")
 
 @app.post("/get_first_frame/")
 async def get_first_frame(file: UploadFile = File(...)):
     # Save temp video
-    video_path = f"temp_{file.filename}"
-    with open(video_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    video_path = f"temp_{uuid.uuid4().hex}_{os.path.basename(file.filename)}"
+    content = await file.read()
+    async with io_slots:
+        await run_blocking(io_executor, write_file, video_path, content)
 
-    cap = cv2.VideoCapture(video_path)
-    success, frame = cap.read()
-    cap.release()
+    async with decode_slots:
+        jpeg = await run_blocking(decode_executor, read_first_frame_jpeg, video_path)
 
-    if not success:
+    if jpeg is None:
         return {"error": "Failed to read video"}
 
-    # Convert frame to JPG in memory
-    _, buffer = cv2.imencode(".jpg", frame)
-    io_buf = io.BytesIO(buffer)
-
-    return StreamingResponse(io_buf, media_type="image/jpeg")
\ No newline at end of file
+    return StreamingResponse(io.BytesIO(jpeg), media_type="image/jpeg")
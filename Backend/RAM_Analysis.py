@@ -1,13 +1,46 @@
-import cv2, numpy as np,random,os
+import cv2, numpy as np,random,os,uuid,logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 from movementDetector import movementDetectionModel
 from randomForest import NoiseFilter
-from datetime import datetime
+from detectionTrace import DetectionTrace
+from boxTracker import BoxTracker
+from armVisitTracker import ArmVisitTracker, score_trace
+from sharedFrames import SharedFrameRing, get_checked
+from framePipeline import probe_video, decode_worker, detect_worker, split_rows, detect_segment, sample_positions, read_sample
+from resultCache import ResultCache
+from outputCatalog import OutputCatalog
+from analysisConfig import AnalysisConfig
+from metrics import metrics, JobTrace
+
+logger = logging.getLogger(__name__)
 
 class RAM_Analysis:
-    def __init__(self,dataset:str):
-        self.rf = NoiseFilter(dataset)
-        self.rf.train()
+    def __init__(self,dataset:str,output_dir:str = os.path.abspath("../public/output"),cache_dir:str = "cache",trace_dir:str = None,config:AnalysisConfig = None,model_path:str = None,catalog:OutputCatalog = None):
+        self.config = config or AnalysisConfig.load()
+        self.rf = NoiseFilter.load_or_train(dataset,model_path,n_trees=self.config.n_trees,max_depth=self.config.max_depth)
         self.progress_video = -1
+        self.output_dir = output_dir
+        self.trace_dir = trace_dir
+        if trace_dir is not None:
+            os.makedirs(trace_dir,exist_ok=True)
+        self.cache = ResultCache(cache_dir,output_dir)
+        # the API builds the catalog at startup so results are served before the model is ready
+        self.catalog = catalog or OutputCatalog(os.path.join(cache_dir,"catalog.sqlite3"),output_dir)
+        self.cache.on_evict = self.remove_output
+        self.preview_dir = self.catalog.preview_dir
+
+    def poster_path(self,video:str):
+        return self.catalog.poster_path(video)
+
+    def preview_path(self,video:str):
+        return self.catalog.preview_path(video)
+
+    def remove_output(self,video:str):
+        self.catalog.remove_video(video)
+        for path in (self.poster_path(video),self.preview_path(video)):
+            if os.path.exists(path):
+                os.remove(path)
     
     def draw_random_shape(self,frame):
         h, w, _ = frame.shape
@@ -150,84 +183,423 @@ class RAM_Analysis:
             
         return cv2.addWeighted(overlay, alpha, frame, 1 - alpha, 0)
 
-    def process_video(self,videos_path:str,overlay_mask:list[str]):
-        md = movementDetectionModel(videos_path,frame_gap=5)
-        totalFrame = len(md.video)
-        
+    def process_video(self,videos_path:str,overlay_mask:list[str],render:bool = True,job_id:str = None,pipeline:str = None,config:AnalysisConfig = None):
+        """
+        Analyse a video and return its result dict (video, source, right, wrong, frames).
+
+        Detection traces are reused from the cache when only the overlay mask
+        changed; with render=False the arm counts are recomputed from the trace
+        without decoding the video at all. When trace_dir is set, per-frame
+        stage timings are written to <trace_dir>/<job_id>.jsonl.
+
+        pipeline="shared" decodes and detects in worker processes that pass
+        frames through shared memory, overlapping them with encoding here.
+        pipeline="chunked" splits detection of the video into segments run on
+        all cores (see detect_chunked); rendering decodes frames here as the
+        segments are stitched, overlapping with the workers.
+
+        config defaults to the server config (see AnalysisConfig.for_job for
+        per-job variants); pipeline, when given, overrides config.pipeline.
+        """
+        job_id = job_id or uuid.uuid4().hex
+        config = config or self.config
+        pipeline = pipeline or config.pipeline
         original_filename = os.path.basename(videos_path)
+        # one output file per job: results and catalog rows are keyed by this name
+        video_name = f"{job_id}.webm"
+
+        trace_key = self.cache.trace_key(self.cache.video_hash(videos_path),config.detection_params(),self.rf.version)
+        result_key = self.cache.result_key(trace_key,overlay_mask,config.arm_rules())
+        cached = self.cache.load_result(result_key)
+        if cached is not None and (cached["video"] is not None or not render):
+            return cached
+
+        job_trace = JobTrace(os.path.join(self.trace_dir,f"{job_id}.jsonl") if self.trace_dir else None)
+        try:
+            trace = self.cache.load_trace(trace_key)
+            if trace is None and pipeline == "shared":
+                md = movementDetectionModel(None,frame_gap=config.frame_gap)
+                trace, result = self.analyse_shared(md,videos_path,config,overlay_mask,original_filename,render,job_trace,self.cache.events_path(result_key),video_name=video_name)
+                self.cache.save_trace(trace_key,trace)
+            elif trace is None and pipeline == "chunked" and render:
+                md = movementDetectionModel(None,frame_gap=config.frame_gap)
+                trace, result = self.analyse_chunked(md,videos_path,config,overlay_mask,original_filename,job_trace,self.cache.events_path(result_key),video_name=video_name)
+                self.cache.save_trace(trace_key,trace)
+            else:
+                md = None
+                if render or (trace is None and pipeline != "chunked"):
+                    md = movementDetectionModel(videos_path,frame_gap=config.frame_gap,brightness=config.brightness)
+
+                render_range = (0,100)
+                if trace is None:
+                    detect_range = (0,50) if render else (0,100)
+                    render_range = (50,100)
+                    if pipeline == "chunked":
+                        trace = self.detect_chunked(videos_path,config,detect_range)
+                    else:
+                        # analysis-only runs classify the whole video in one batch
+                        trace = self.detect_video(md,config,detect_range,job_trace,batch_frames=256 if render else None)
+                    self.cache.save_trace(trace_key,trace)
+
+                if render:
+                    result = self.render_video(md,trace,overlay_mask,original_filename,render_range,job_trace,self.cache.events_path(result_key),config.arm_rules(),video_name)
+                else:
+                    result = self.score_arms(trace,overlay_mask,self.cache.events_path(result_key),config.arm_rules())
+                    result["video"] = None
+        finally:
+            job_trace.close()
+            self.progress_video = -1
+        result["source"] = original_filename
+        metrics.inc("jobs",render=render)
+
+        if result["video"] is not None:
+            self.catalog.add(
+                job_id,
+                result["video"],
+                source=original_filename,
+                duration=result["frames"]/config.frame_gap,
+                frames=result["frames"],
+                right=result["right"],
+                wrong=result["wrong"],
+            )
+        self.cache.save_result(result_key,result)
+        return result
+
+    def detect_video(self,md:movementDetectionModel,config:AnalysisConfig,progress_range=(0,100),job_trace:JobTrace = None,batch_frames:int = 256) -> DetectionTrace:
+        """
+        Motion detection over md.video. Boxes are collected in the trace and
+        classified every batch_frames frames (or once at the end when None)
+        instead of one forest call per frame.
+        """
+        totalFrame = len(md.video)
+        h, w = md.video[0].shape[:2]
+        trace = DetectionTrace(totalFrame-1,config.grid_size,(h,w))
+        tracker = BoxTracker() if config.tracking else None
+        batch_frames = batch_frames or max(totalFrame-1,1)
+        records = []
+
+        for frameIdx in range(totalFrame-1):
+            record = metrics.begin_frame(stage="detect",frame=frameIdx)
+            curr_frame = md.video[frameIdx+1]
+            prev_frame = md.video[frameIdx]
+            cells, box = md.detect_tracked(prev_frame,curr_frame,tracker,grid_size=config.grid_size,threshold=config.threshold,black_threshold=config.black_threshold)
+            trace.set_detection(frameIdx,box,cells)
+            record["cells"] = len(cells)
+            metrics.end_frame("detect")
+            records.append(record)
+
+            if len(records) == batch_frames or frameIdx == totalFrame-2:
+                self.classify_rows(trace,frameIdx+1-len(records),frameIdx+1,records,job_trace)
+                records = []
+
+            self._set_progress(frameIdx,totalFrame,progress_range)
+            md.progress_bar(frameIdx+1,totalFrame,message="🔍 Detecting Movement ")
+
+        return trace.finalize()
+
+    def classify_rows(self,trace:DetectionTrace,start:int,stop:int,records:list = None,job_trace:JobTrace = None):
+        """
+        Batch-classify the boxes of rows [start, stop) and flush their job
+        trace records (records[i] belongs to row start+i) with the labels.
+        """
+        with metrics.timer("rf_inference"):
+            rows = trace.classify(self.rf.predict_boxes,start,stop)
+        labels = trace.pred[rows]
+        metrics.inc("rf_batches")
+        self._count_boxes(labels)
+
+        if job_trace is not None and records:
+            for frameIdx, label in zip(rows,labels):
+                records[frameIdx-start]["label"] = int(label)
+            for record in records:
+                job_trace.record(record)
+
+    def detect_chunked(self,videos_path:str,config:AnalysisConfig,progress_range=(0,100),n_workers:int = None) -> DetectionTrace:
+        """
+        detect_video over time segments of one video in parallel processes,
+        stitched into the exact trace a sequential run would produce.
+        """
+        trace = self.chunked_trace(videos_path,config)
+        n_rows = 0
+        for n_rows in self.stitch_chunked(videos_path,config,trace,progress_range,n_workers):
+            pass
+        return trace.truncate(n_rows)
+
+    def chunked_trace(self,videos_path:str,config:AnalysisConfig) -> DetectionTrace:
+        n_samples, frame_shape = probe_video(videos_path,config.frame_gap)
+        return DetectionTrace(max(n_samples-1,0),config.grid_size,frame_shape[:2])
+
+    def stitch_chunked(self,videos_path:str,config:AnalysisConfig,trace:DetectionTrace,progress_range=None,n_workers:int = None):
+        """
+        Fill trace from segment workers, yielding the number of finished rows
+        after each segment so rows can be consumed while later segments are
+        still being detected.
+
+        Motion detection and classification are stateless apart from the box
+        tracker, and each segment starts with a lost track. While stitching,
+        the rows at the head of a segment are re-run here with the tracker
+        state carried over from the previous segment until it agrees with the
+        state the worker had at that row; from there on both runs are
+        identical and the worker's rows are taken as is. Without tracking, or
+        whenever the track was lost at the cut, nothing is re-run.
+        """
+        n_workers = n_workers or os.cpu_count() or 1
+        step, brightness = config.frame_gap, config.brightness
+        n_rows = len(trace)
+        segments = split_rows(n_rows,n_workers)
+
+        tracker = BoxTracker() if config.tracking else None
+        md = movementDetectionModel(None)
+        cap = cv2.VideoCapture(videos_path)
+        samples = sample_positions(cap,step)
+        row = 0
+
+        with ProcessPoolExecutor(max_workers=min(n_workers,len(segments)) or 1,mp_context=mp.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(detect_segment,videos_path,self.rf.model,config,start,stop)
+                for start, stop in segments
+            ]
+            for (start, planned_stop), future in zip(segments,futures):
+                segment, states, final_state = future.result()
+                stop = start + len(segment)
+
+                # head of the segment: re-run until the tracker states agree
+                prev = None
+                while row < stop and tracker is not None and tracker.state != states[row-start]:
+                    if prev is None:
+                        prev = read_sample(cap,samples,row,brightness)
+                    curr = read_sample(cap,samples,row+1,brightness)
+                    cells, box = md.detect_tracked(prev,curr,tracker,grid_size=config.grid_size,threshold=config.threshold,black_threshold=config.black_threshold)
+                    trace.set_detection(row,box,cells)
+                    prev = curr
+                    row += 1
+                if row > start:
+                    self.classify_rows(trace,start,row)
+                metrics.inc("chunk_rerun_rows",value=row-start)
+
+                if row < stop:
+                    copied = slice(row-start,len(segment))
+                    self._count_boxes(segment.pred[copied][segment.boxes[copied,0] >= 0])
+                    for segIdx in range(row-start,len(segment)):
+                        box = segment.box(segIdx)
+                        trace.set_detection(start+segIdx,box,segment.frame_cells(segIdx))
+                        if box:
+                            trace.set_label(start+segIdx,int(segment.pred[segIdx]),segment.prob[segIdx])
+                    row = stop
+                    if tracker is not None:
+                        tracker.state = final_state
+
+                if progress_range is not None:
+                    self._set_progress(row,n_rows+1,progress_range)
+                yield row
+                if stop < planned_stop:
+                    # the video ended early, as preparingVideo would have stopped here
+                    break
+
+        cap.release()
+
+    def analyse_chunked(self,md:movementDetectionModel,videos_path:str,config:AnalysisConfig,overlay_mask:list[str],original_filename:str,job_trace:JobTrace = None,events_path:str = None,n_workers:int = None,video_name:str = None):
+        """
+        Chunked detection with rendering overlapped: frame i is decoded and
+        drawn here as soon as row i is stitched, while the workers are still
+        on later segments. Nothing is decoded twice in this process.
+        """
+        trace = self.chunked_trace(videos_path,config)
+        stitched = self.stitch_chunked(videos_path,config,trace,n_workers=n_workers)
+        n_rows = 0
+
+        def frames():
+            nonlocal n_rows
+            cap = cv2.VideoCapture(videos_path)
+            samples = sample_positions(cap,config.frame_gap)
+            try:
+                for frameIdx in range(len(trace)):
+                    while frameIdx >= n_rows:
+                        n_rows = next(stitched,None)
+                        if n_rows is None:
+                            n_rows = frameIdx
+                            return
+                    frame = read_sample(cap,samples,frameIdx+1,config.brightness)
+                    if frame is None:
+                        return
+                    yield frameIdx, frame
+            finally:
+                cap.release()
+
+        try:
+            result = self.render_frames(md,frames(),trace,overlay_mask,original_filename,job_trace=job_trace,events_path=events_path,rules=config.arm_rules(),video_name=video_name)
+        finally:
+            stitched.close()
+        trace.truncate(n_rows)
+        result["frames"] = len(trace)
+        return trace, result
+
+    def analyse_shared(self,md:movementDetectionModel,videos_path:str,config:AnalysisConfig,overlay_mask:list[str],original_filename:str,render:bool,job_trace:JobTrace = None,events_path:str = None,n_slots:int = 8,video_name:str = None):
+        """
+        Decoder process -> shared-memory ring -> detector process -> this
+        process (arm tracking, drawing, encoding). Frames never get pickled;
+        only slot indices and the small detection rows cross processes.
+        """
+        ctx = mp.get_context("spawn")
+        n_samples, frame_shape = probe_video(videos_path,config.frame_gap)
+        ring = SharedFrameRing(ctx,n_slots,frame_shape)
+        filled, detected = ctx.Queue(), ctx.Queue()
+        workers = [
+            ctx.Process(target=decode_worker,args=(ring,filled,videos_path,config.frame_gap,config.brightness),name="decoder",daemon=True),
+            ctx.Process(target=detect_worker,args=(ring,filled,detected,self.rf.model,config),name="detector",daemon=True),
+        ]
+        trace = DetectionTrace(max(n_samples-1,0),config.grid_size,frame_shape[:2])
+        n_rows = 0
+
+        def rows():
+            nonlocal n_rows
+            while True:
+                msg = get_checked(detected,workers)
+                if msg is None:
+                    return
+                frameIdx, box, cells, pred, prob, slot = msg
+                trace.set_detection(frameIdx,box,cells)
+                if box:
+                    trace.set_label(frameIdx,pred,prob)
+                    metrics.inc("boxes",label="noise" if pred == 0 else "valid")
+                n_rows = frameIdx+1
+                try:
+                    yield frameIdx, ring.frames[slot]
+                finally:
+                    ring.release(slot)
+
+        for worker in workers:
+            worker.start()
+        try:
+            if render:
+                result = self.render_frames(md,rows(),trace,overlay_mask,original_filename,job_trace=job_trace,events_path=events_path,rules=config.arm_rules(),video_name=video_name)
+            else:
+                for frameIdx, _ in rows():
+                    self._set_progress(frameIdx,n_samples)
+            for worker in workers:
+                worker.join()
+        except BaseException:
+            for worker in workers:
+                worker.terminate()
+            raise
+        finally:
+            ring.close()
+
+        trace.truncate(n_rows)
+        if render:
+            result["frames"] = len(trace)
+        else:
+            result = self.score_arms(trace,overlay_mask,events_path,config.arm_rules())
+            result["video"] = None
+        return trace, result
+
+    def score_arms(self,trace:DetectionTrace,overlay_mask:list[str],events_path:str = None,rules:dict = None) -> dict:
+        tracker = score_trace(trace,overlay_mask,**(rules or {}))
+        if events_path is not None:
+            tracker.save_events(events_path)
+        result = tracker.summary()
+        result["frames"] = len(trace)
+        return result
+
+    def draw_frame(self,md:movementDetectionModel,frame,trace:DetectionTrace,frameIdx:int,inside:int,armLog:dict,right:int,wrong:int,overlay_mask:list[str],original_filename:str):
+        box = trace.box(frameIdx)
+        curr_frame = md.draw_detection(frame,trace.frame_cells(frameIdx),box,grid_size=trace.grid_size)
+        if (len(box) > 0):
+            curr_frame = cv2.rectangle(curr_frame,(box[0],box[1]),(box[2],box[3]),(0,255,255),3)
+            pred = int(trace.pred[frameIdx])
+            prob = trace.prob[frameIdx]
+            label = "Noise" if pred == 0 else "Valid"
+            color = (0,255,0) if label == "Valid" else (0,0,255)
+            
+            cv2.putText(curr_frame, f"Prediction: {label} {prob[pred]*100:.1f}%", (50,50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2, cv2.LINE_AA)
+            cv2.putText(curr_frame, f"Prediction: {label} {prob[pred]*100:.1f}%, Status: {inside >= 0}", (box[0],box[1]-20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2, cv2.LINE_AA)
+
+        cv2.putText(curr_frame, f"{original_filename}", (50,100), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0,255,0), 2, cv2.LINE_AA)
+        cv2.putText(curr_frame, f"right: {right}", (50,150), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0,255,0), 2, cv2.LINE_AA)
+        cv2.putText(curr_frame, f"wrong: {wrong}", (50,200), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0,0,255), 2, cv2.LINE_AA)
         
+        curr_frame = self.draw_yolo_mask(curr_frame,overlay_mask,armLog)
+        return curr_frame
+
+    def render_video(self,md:movementDetectionModel,trace:DetectionTrace,overlay_mask:list[str],original_filename:str,progress_range=(0,100),job_trace:JobTrace = None,events_path:str = None,rules:dict = None,video_name:str = None) -> dict:
+        frames = ((frameIdx,md.video[frameIdx+1]) for frameIdx in range(len(trace)))
+        return self.render_frames(md,frames,trace,overlay_mask,original_filename,progress_range,job_trace,events_path,rules,video_name)
+
+    def render_frames(self,md:movementDetectionModel,frames,trace:DetectionTrace,overlay_mask:list[str],original_filename:str,progress_range=(0,100),job_trace:JobTrace = None,events_path:str = None,rules:dict = None,video_name:str = None) -> dict:
+        """
+        Draw and encode (frameIdx, frame) pairs in order. Row frameIdx of the
+        trace only has to be filled in by the time its frame is yielded, so
+        frames may stream in while detection is still running.
+
+        The video is written to output_dir/video_name; process_video names it
+        after the job so concurrent or same-second jobs never share a file.
+        """
+        totalFrame = len(trace)+1
+
         # --- VideoWriter setup ---
-        filename = datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + ".webm"
-        output_dir = os.path.abspath("../public/output")
-        os.makedirs(output_dir, exist_ok=True)
+        filename = video_name or f"{uuid.uuid4().hex}.webm"
+        os.makedirs(self.output_dir, exist_ok=True)
 
-        finalPath = os.path.join(output_dir, filename)
+        finalPath = os.path.join(self.output_dir, filename)
         
         fourcc = cv2.VideoWriter_fourcc(*'VP80')
-        h, w = md.video[0].shape[:2]             # get height and width from first frame
+        h, w = trace.frame_shape
         out = cv2.VideoWriter(finalPath, fourcc, md.frame_gap, (w, h))  # fps = 30, adjust if needed
+
+        # low-res preview + poster, written while the rendered frames are in memory
+        preview_size = (max(w//4,2)//2*2, max(h//4,2)//2*2)
+        preview = cv2.VideoWriter(self.preview_path(filename), fourcc, md.frame_gap, preview_size)
+        poster_idx = len(trace)//2
         # -------------------------
-        
-        armLog = {}
-        lastArm = None
-        for frameIdx in range(totalFrame-1):            
-            curr_frame = md.video[frameIdx+1]
-            prev_frame = md.video[frameIdx]
-            curr_frame = md.draw_grid_difference(prev_frame,curr_frame,grid_size=10,threshold=80)
-            if (len(md.box) > 0):
-                curr_frame = cv2.rectangle(curr_frame,(md.box[0],md.box[1]),(md.box[2],md.box[3]),(0,255,255),3)
-                pred, prob = self.rf.predict_box(md.box[0],md.box[1],md.box[2],md.box[3])
-                label = "Noise" if pred == 0 else "Valid"
-                color = (0,255,0) if label == "Valid" else (0,0,255)
-                
-                cv2.putText(curr_frame, f"Prediction: {label} {prob[pred]*100}%", (50,50), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2, cv2.LINE_AA)
-                
-                h,w = curr_frame.shape[:2]
-                inside = self.getIsInsideArm(md.box,overlay_mask,h,w)
-                if (label == "Valid"):
-                    if (inside != False):
-                        cx = (md.box[0] + md.box[2])/2
-                        cy = (md.box[1] + md.box[3])/2
-                        maskCenter = self.get_polygon_center(inside,w,h)
-                        distance_to_center = md.euclidDistance((cx,cy),(int(maskCenter[0]),int(maskCenter[1])))/100
-                        print(f"Distance: {distance_to_center}")
-                        if (lastArm != inside and distance_to_center <= 0.5):
-                            if (inside not in armLog):
-                                armLog[inside] = 1
-                            else:
-                                armLog[inside] += 1
-                            lastArm = inside
-                    else:
-                        lastArm = None
-                cv2.putText(curr_frame, f"Prediction: {label} {prob[pred]*100}%, Status: {inside != False}", (md.box[0],md.box[1]-20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2, cv2.LINE_AA)
-    
-                
-            
-            right = len(armLog)
-            wrong = 0
-            for i in list(armLog.values()):
-                print(i)
-                if (i > 1):
-                    wrong += i-1
-                
-            # print(f"right: {right} wrong: {wrong}")
-            cv2.putText(curr_frame, f"{original_filename}", (50,100), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0,255,0), 2, cv2.LINE_AA)
-            cv2.putText(curr_frame, f"right: {right}", (50,150), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0,255,0), 2, cv2.LINE_AA)
-            cv2.putText(curr_frame, f"wrong: {wrong}", (50,200), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0,0,255), 2, cv2.LINE_AA)
-            
-            curr_frame = self.draw_yolo_mask(curr_frame,overlay_mask,armLog)
+
+        tracker = ArmVisitTracker(overlay_mask,trace.frame_shape,**(rules or {}))
+        for frameIdx, frame in frames:
+            # begun first so the arm lookup counts towards this frame's record
+            record = metrics.begin_frame(stage="render",frame=frameIdx)
+            box = trace.box(frameIdx)
+            inside = -1
+            if (len(box) > 0):
+                with metrics.timer("arm_lookup"):
+                    inside = tracker.consume(frameIdx,box,int(trace.pred[frameIdx]))
+            right, wrong = tracker.right, tracker.wrong
+            record.update(right=right,wrong=wrong)
+            with metrics.timer("draw"):
+                curr_frame = self.draw_frame(md,frame,trace,frameIdx,inside,tracker.arm_log,right,wrong,overlay_mask,original_filename)
 
             # --- write frame to video ---
-            self.progress_video = int((frameIdx/totalFrame)*100)
-            # print(f"video progress: {self.progress_video}%")
+            self._set_progress(frameIdx,totalFrame,progress_range)
             md.progress_bar(frameIdx+1,totalFrame,message=f"Right: {right}, Wrong: {wrong}")
-            out.write(curr_frame)
+            with metrics.timer("encode"):
+                out.write(curr_frame)
+
+                small = cv2.resize(curr_frame, preview_size, interpolation=cv2.INTER_AREA)
+                preview.write(small)
+                if frameIdx == poster_idx:
+                    cv2.imwrite(self.poster_path(filename), cv2.resize(curr_frame, (preview_size[0]*2, preview_size[1]*2), interpolation=cv2.INTER_AREA))
+
+            metrics.end_frame("render")
+            if job_trace is not None:
+                job_trace.record(record)
         
-        self.progress_video = -1
         out.release()
-        cv2.destroyAllWindows()
+        preview.release()
+        tracker.close(len(trace))
+        if events_path is not None:
+            tracker.save_events(events_path)
+        result = tracker.summary()
+        result.update({"video": filename, "frames": len(trace)})
+        return result
+
+    def _count_boxes(self,labels):
+        metrics.inc("boxes",int(np.sum(labels == 0)),label="noise")
+        metrics.inc("boxes",int(np.sum(labels != 0)),label="valid")
+
+    def _set_progress(self,frameIdx:int,totalFrame:int,progress_range=(0,100)):
+        start, end = progress_range
+        self.progress_video = start + int((frameIdx/totalFrame)*(end-start))
         
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     videos_path = [
         r"E:\data datathon\RAM video\A1_Hari 10.mp4",
         r"E:\data datathon\RAM video\A2_Hari 10.mp4",
@@ -0,0 +1,160 @@
+import dataclasses
+import json
+import os
+from dataclasses import dataclass
+
+
+PIPELINES = ("memory", "shared", "chunked")
+
+# fields that change the trained forest; fixed for the life of the server
+MODEL_FIELDS = ("n_trees", "max_depth")
+
+# fields whose value changes the detection trace (part of its cache key)
+DETECTION_FIELDS = ("grid_size", "threshold", "black_threshold", "frame_gap", "brightness", "tracking")
+
+# fields of the arm-entry rule (part of the result cache key)
+ARM_FIELDS = ("entry_radius", "distance_scale")
+
+# grid_size stays at 10 in every preset: the forest is trained on boxes built
+# from 10 px cells, and with 8 or 20 px cells benchmark.py counts an extra
+# wrong entry. Measured with `python benchmark.py --preset <name>` (1280x720,
+# 240/480 sampled frames), see the commit that introduced these numbers.
+PRESETS = {
+    "default": {},
+    # every 10th frame and a smaller forest
+    "fast": {"frame_gap": 10, "n_trees": 20, "max_depth": 10},
+    # denser sampling and a larger forest for short clips where accuracy matters
+    "accurate": {"frame_gap": 3, "n_trees": 100, "max_depth": 14},
+}
+
+
+@dataclass(frozen=True)
+class AnalysisConfig:
+    """
+    Detector, arm-rule and forest settings of the pipeline.
+
+    Built once with load() (preset < JSON file < RAM_* environment variables
+    < explicit overrides), validated, and passed down to every stage. Per-job
+    variants come from for_job(), which may change anything but the forest.
+    """
+
+    # motion detection
+    grid_size: int = 10
+    threshold: int = 80
+    black_threshold: int = 50
+    frame_gap: int = 5
+    brightness: float = 6
+    tracking: bool = True
+    # arm entry: box centre within entry_radius * distance_scale px of the arm centroid
+    entry_radius: float = 0.5
+    distance_scale: float = 100
+    # random forest
+    n_trees: int = 50
+    max_depth: int = 12
+    # execution
+    pipeline: str = "memory"
+
+    def __post_init__(self):
+        self.validate()
+
+    def validate(self):
+        checks = [
+            (self.grid_size > 0, "grid_size must be positive"),
+            (0 <= self.threshold <= 255, "threshold must be within 0..255"),
+            (0 <= self.black_threshold <= 255, "black_threshold must be within 0..255"),
+            (self.frame_gap >= 1, "frame_gap must be at least 1"),
+            (self.brightness > 0, "brightness must be positive"),
+            (self.entry_radius > 0, "entry_radius must be positive"),
+            (self.distance_scale > 0, "distance_scale must be positive"),
+            (self.n_trees >= 1, "n_trees must be at least 1"),
+            (self.max_depth >= 1, "max_depth must be at least 1"),
+            (self.pipeline in PIPELINES, f"pipeline must be one of {', '.join(PIPELINES)}"),
+        ]
+        for ok, message in checks:
+            if not ok:
+                raise ValueError(message)
+
+    @classmethod
+    def _coerce(cls, values:dict) -> dict:
+        types = {field.name: field.type for field in dataclasses.fields(cls)}
+        coerced = {}
+        for name, value in values.items():
+            if name not in types:
+                raise ValueError(f"Unknown config field: {name}")
+            kind = types[name]
+            try:
+                if kind is bool and isinstance(value, str):
+                    if value.lower() not in ("1", "0", "true", "false", "yes", "no", "on", "off"):
+                        raise ValueError(value)
+                    value = value.lower() in ("1", "true", "yes", "on")
+                elif kind is int and isinstance(value, float) and not value.is_integer():
+                    raise ValueError(value)
+                coerced[name] = kind(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid value for {name}: {value!r}") from None
+        return coerced
+
+    @classmethod
+    def preset(cls, name:str, **overrides):
+        if name not in PRESETS:
+            raise ValueError(f"Unknown preset {name!r}, expected one of {', '.join(PRESETS)}")
+        return cls(**cls._coerce({**PRESETS[name], **overrides}))
+
+    @classmethod
+    def load(cls, path:str = None, env:dict = None, **overrides):
+        """
+        Settings from (in increasing priority) a preset, a JSON file, RAM_<FIELD>
+        environment variables and keyword overrides. The preset is chosen by
+        the "preset" key of the file or RAM_PRESET; the file by path or
+        RAM_CONFIG.
+        """
+        env = os.environ if env is None else env
+        path = path or env.get("RAM_CONFIG")
+        values = {}
+        if path:
+            with open(path) as f:
+                values = json.load(f)
+        preset = env.get("RAM_PRESET", values.pop("preset", "default"))
+
+        for field in dataclasses.fields(cls):
+            key = f"RAM_{field.name.upper()}"
+            if key in env:
+                values[field.name] = env[key]
+        values.update(overrides)
+        return cls.preset(preset, **values)
+
+    def for_job(self, overrides:dict = None, preset:str = None):
+        """
+        Per-job copy with a preset and/or field overrides applied on top of the
+        server config. Forest fields cannot change without retraining: those of
+        the preset are left at the server's values (see ignored_fields) and
+        explicit overrides of them are rejected.
+        """
+        values = {}
+        if preset is not None:
+            if preset not in PRESETS:
+                raise ValueError(f"Unknown preset {preset!r}, expected one of {', '.join(PRESETS)}")
+            values.update({k: v for k, v in PRESETS[preset].items() if k not in MODEL_FIELDS})
+        values.update(self._coerce(overrides or {}))
+        for name in MODEL_FIELDS:
+            if name in values and values[name] != getattr(self, name):
+                raise ValueError(f"{name} is fixed by the loaded model and cannot be set per job")
+        return dataclasses.replace(self, **self._coerce(values))
+
+    def ignored_fields(self, preset:str = None) -> dict:
+        """Forest fields of preset that for_job keeps at this config's values."""
+        if preset is None:
+            return {}
+        return {
+            name: value for name, value in PRESETS.get(preset, {}).items()
+            if name in MODEL_FIELDS and value != getattr(self, name)
+        }
+
+    def detection_params(self) -> dict:
+        return {name: getattr(self, name) for name in DETECTION_FIELDS}
+
+    def arm_rules(self) -> dict:
+        return {name: getattr(self, name) for name in ARM_FIELDS}
+
+    def to_dict(self) -> dict:
+        return dataclasses.asdict(self)
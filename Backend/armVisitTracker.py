@@ -0,0 +1,158 @@
+import math
+from array import array
+
+import cv2
+import numpy as np
+
+
+ENTRY = 0
+EXIT = 1
+
+
+class ArmVisitTracker:
+    """
+    Arm-entry state machine fed with (frame_idx, box, label) tuples.
+
+    Arms get integer ids in mask order. Polygons and centroids are parsed once,
+    right/wrong are kept as running counters, and entries/exits are appended
+    to a compact column-wise event log (frame, arm, kind, visit, dwell).
+
+    Entry rule: a Valid box whose centre lies in an arm and within
+    entry_radius * distance_scale pixels of the arm centroid counts as a visit,
+    unless it is the arm last entered. A Valid box outside every arm resets the
+    last arm.
+    """
+
+    def __init__(self, masks:list[str], frame_shape:tuple[int,int], entry_radius:float = 0.5, distance_scale:float = 100):
+        h, w = frame_shape
+        self.entry_radius = entry_radius
+        self.distance_scale = distance_scale
+        self.masks = [mask.strip() for mask in masks if mask.strip()]
+        self.polygons = []
+        self.centers = []
+        for mask in self.masks:
+            coords = list(map(float, mask.split()[1:]))
+            self.polygons.append(np.array(
+                [(int(coords[i] * w), int(coords[i+1] * h)) for i in range(0, len(coords), 2)],
+                dtype=np.int32,
+            ))
+            points = np.array([[coords[i] * w, coords[i+1] * h] for i in range(0, len(coords), 2)])
+            M = cv2.moments(points.astype(np.int32))
+            if M["m00"] == 0:
+                center = points.mean(axis=0)
+            else:
+                center = (M["m10"] / M["m00"], M["m01"] / M["m00"])
+            self.centers.append((int(center[0]), int(center[1])))
+
+        self.visits = [0] * len(self.masks)
+        self.arm_log = {}
+        self.right = 0
+        self.wrong = 0
+        self.last_arm = -1
+        self.entry_frame = -1
+
+        self.event_frame = array("i")
+        self.event_arm = array("b")
+        self.event_kind = array("b")
+        self.event_visit = array("h")
+        self.event_dwell = array("i")
+
+    def locate(self, box:tuple) -> int:
+        cx = int((box[0] + box[2]) / 2)
+        cy = int((box[1] + box[3]) / 2)
+        for arm, polygon in enumerate(self.polygons):
+            if cv2.pointPolygonTest(polygon, (cx, cy), False) >= 0:
+                return arm
+        return -1
+
+    def _record(self, frame_idx:int, arm:int, kind:int, visit:int, dwell:int):
+        self.event_frame.append(frame_idx)
+        self.event_arm.append(arm)
+        self.event_kind.append(kind)
+        self.event_visit.append(visit)
+        self.event_dwell.append(dwell)
+
+    def _leave(self, frame_idx:int):
+        if self.last_arm >= 0:
+            self._record(frame_idx, self.last_arm, EXIT, self.visits[self.last_arm], frame_idx - self.entry_frame)
+
+    def consume(self, frame_idx:int, box:tuple, label:int) -> int:
+        """
+        Feed one frame; returns the arm id containing the box centre, or -1.
+        """
+        if not box:
+            return -1
+
+        arm = self.locate(box)
+        if label == 0:
+            return arm
+
+        if arm < 0:
+            self._leave(frame_idx)
+            self.last_arm = -1
+            return arm
+
+        if arm != self.last_arm:
+            cx = (box[0] + box[2]) / 2
+            cy = (box[1] + box[3]) / 2
+            mx, my = self.centers[arm]
+            distance = math.sqrt((mx - cx) ** 2 + (my - cy) ** 2) / self.distance_scale
+            if distance <= self.entry_radius:
+                self._leave(frame_idx)
+                self.visits[arm] += 1
+                self.arm_log[self.masks[arm]] = self.visits[arm]
+                if self.visits[arm] == 1:
+                    self.right += 1
+                else:
+                    self.wrong += 1
+                self.last_arm = arm
+                self.entry_frame = frame_idx
+                self._record(frame_idx, arm, ENTRY, self.visits[arm], -1)
+        return arm
+
+    def close(self, frame_idx:int):
+        """
+        End of video: close the open visit so its dwell time is logged.
+        """
+        self._leave(frame_idx)
+        self.last_arm = -1
+
+    def consume_trace(self, trace):
+        for frameIdx in range(len(trace)):
+            box = trace.box(frameIdx)
+            if box:
+                self.consume(frameIdx, box, int(trace.pred[frameIdx]))
+        self.close(len(trace))
+        return self
+
+    def events(self) -> dict:
+        # copies, so the arrays can keep growing while callers hold the result
+        return {
+            "frame": np.frombuffer(self.event_frame, dtype=np.int32).copy(),
+            "arm": np.frombuffer(self.event_arm, dtype=np.int8).copy(),
+            "kind": np.frombuffer(self.event_kind, dtype=np.int8).copy(),
+            "visit": np.frombuffer(self.event_visit, dtype=np.int16).copy(),
+            "dwell": np.frombuffer(self.event_dwell, dtype=np.int32).copy(),
+        }
+
+    def summary(self) -> dict:
+        events = self.events()
+        exits = events["kind"] == EXIT
+        return {
+            "right": self.right,
+            "wrong": self.wrong,
+            "visits": list(self.visits),
+            "entries": int(np.sum(events["kind"] == ENTRY)),
+            "revisits": self.wrong,
+            "mean_dwell": float(np.mean(events["dwell"][exits])) if exits.any() else None,
+        }
+
+    def save_events(self, path:str):
+        np.savez_compressed(path, masks=np.array(self.masks), **self.events())
+
+
+def score_trace(trace, masks:list[str], **rules) -> ArmVisitTracker:
+    """
+    Re-run the arm-entry rules over a stored DetectionTrace, without decoding.
+    """
+    return ArmVisitTracker(masks, trace.frame_shape, **rules).consume_trace(trace)
@@ -0,0 +1,300 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from RAM_Analysis import RAM_Analysis
+from armVisitTracker import ArmVisitTracker
+from analysisConfig import AnalysisConfig, PRESETS
+from movementDetector import movementDetectionModel
+from metrics import metrics
+
+
+DEFAULT_MASKS = [
+    "0 0.526250 0.064444 0.580000 0.057778 0.573750 0.406667 0.523750 0.406667",
+    "0 0.606250 0.464444 0.607500 0.546667 0.851250 0.568889 0.850000 0.466667",
+    "0 0.525000 0.586667 0.565000 0.588889 0.566250 0.997778 0.525000 0.997778",
+    "0 0.268750 0.448889 0.260000 0.524444 0.492500 0.531111 0.492500 0.466667",
+    "0 0.347500 0.200000 0.375000 0.153333 0.515000 0.402222 0.488750 0.446667",
+    "0 0.327500 0.811111 0.362500 0.877778 0.522500 0.602222 0.495000 0.546667",
+    "0 0.573750 0.591111 0.613750 0.551111 0.772500 0.822222 0.731250 0.891111",
+    "0 0.582500 0.411111 0.607500 0.451111 0.756250 0.222222 0.720000 0.155556",
+]
+
+DEFAULT_SCRIPT = [0, 3, 5, 3, 1, 7, 2, 0, 6, 4]
+
+class SyntheticMaze:
+    """
+    Renders a fake RAM recording: eight arms from YOLO polygon strings, a dark
+    blob visiting arms in scripted order and random black noise shapes.
+
+    Raw pixel values are kept dark so the brightness boost applied by
+    movementDetectionModel lifts the floor but leaves the blob black. The blob
+    is sized like the rat boxes in the training CSV (about 40 px at 1280x720)
+    and never smaller than two detection cells, so it always fills whole
+    cells. Noise only appears while the blob is outside every arm and is
+    centred outside the arms, so it exercises the noise filter without being
+    able to fake an arm entry or split a visit.
+    """
+
+    def __init__(self, ra:RAM_Analysis, masks:list[str], width:int, height:int, seed:int = 0):
+        self.ra = ra
+        self.masks = masks
+        self.width = width
+        self.height = height
+        self.rng = random.Random(seed)
+        self.centers = [ra.get_polygon_center(mask, width, height) for mask in masks]
+        self.maze_center = np.mean(self.centers, axis=0)
+        self.blob_radius = max(20, int(0.016 * width))
+        self.arms = ArmVisitTracker(masks, (height, width))
+
+        background = np.full((height, width, 3), 30, dtype=np.uint8)
+        for poly in ra.parse_yolo_polygon(";".join(masks), width, height):
+            cv2.fillPoly(background, [poly], (40, 40, 40))
+        self.background = background
+
+    def blob_path(self, script:list[int], steps_per_leg:int, dwell:int):
+        """
+        Blob centre for every sampled frame: centre -> arm -> centre for each
+        scripted visit, moving about the arm centroid for `dwell` frames. A
+        still blob leaves no motion, so dwelling in place would give the entry
+        rule a single frame within its radius.
+        """
+        r = self.blob_radius
+        wander = [np.array(offset) for offset in ((r, 0), (0, r), (-r, 0), (0, -r))]
+        path = [self.maze_center] * dwell
+        for arm in script:
+            target = self.centers[arm]
+            for t in np.linspace(0, 1, steps_per_leg):
+                path.append(self.maze_center + (target - self.maze_center) * t)
+            path.extend(target + wander[i % len(wander)] for i in range(dwell))
+            path.append(target)
+            for t in np.linspace(1, 0, steps_per_leg):
+                path.append(self.maze_center + (target - self.maze_center) * t)
+        return path
+
+    def in_arm(self, center) -> bool:
+        x, y = int(center[0]), int(center[1])
+        return self.arms.locate((x, y, x, y)) >= 0
+
+    def noise_frame(self, frame):
+        # redraw until the shape is centred outside every arm
+        for _ in range(20):
+            state = random.getstate()
+            random.seed(self.rng.random())
+            shape = self.ra.draw_random_shape(np.full_like(frame, 255))
+            random.setstate(state)
+            ys, xs = np.nonzero(shape[:, :, 0] == 0)
+            if len(xs) and not self.in_arm(((xs.min() + xs.max()) / 2, (ys.min() + ys.max()) / 2)):
+                return np.minimum(frame, shape)
+        return frame
+
+    def write(self, path:str, n_frames:int, script:list[int], frame_gap:int, noise_rate:float = 0.1, dwell:int = 3, min_steps:int = 3):
+        """
+        Write exactly n_frames sampled frames (plus the first one that
+        movementDetectionModel drops); returns n_frames.
+        """
+        legs = len(script) * 2
+        fixed = dwell + len(script) * (dwell + 1)
+        steps_per_leg = (n_frames - fixed) // legs
+        if steps_per_leg < min_steps:
+            raise ValueError(f"{n_frames} frames are too few for a {len(script)}-visit script, need at least {legs * min_steps + fixed}")
+        positions = self.blob_path(script, steps_per_leg, dwell)
+        positions += [self.maze_center] * (n_frames - len(positions))
+
+        out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30, (self.width, self.height))
+        # movementDetectionModel drops its first sampled frame
+        for pos in [positions[0]] + positions:
+            frame = self.background.copy()
+            cv2.circle(frame, (int(pos[0]), int(pos[1])), self.blob_radius, (0, 0, 0), -1)
+            if self.rng.random() < noise_rate and not self.in_arm(pos):
+                frame = self.noise_frame(frame)
+            # only every frame_gap-th frame is sampled, the rest are filler
+            for _ in range(frame_gap):
+                out.write(frame)
+        out.release()
+        return len(positions)
+
+
+def expected_counts(script:list[int]):
+    right = len(set(script))
+    return right, len(script) - right
+
+
+def measure(fn, trace_memory:bool):
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    value = fn()
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return value, elapsed, peak
+
+
+def stage_totals():
+    return {
+        dict(labels)["stage"]: hist.total
+        for (name, labels), hist in metrics.histograms.items()
+        if name == "stage_seconds"
+    }
+
+
+def same_trace(a, b):
+    return (
+        np.array_equal(a.boxes, b.boxes)
+        and np.array_equal(a.pred, b.pred)
+        and np.array_equal(a.prob, b.prob)
+        and np.array_equal(a.cell_offsets, b.cell_offsets)
+        and np.array_equal(a.cells, b.cells)
+    )
+
+
+def run_case(ra:RAM_Analysis, workdir:str, width:int, height:int, n_frames:int, script:list[int], seed:int, render:bool, trace_memory:bool, workers:int = 0):
+    video_path = os.path.join(workdir, f"maze_{width}x{height}_{n_frames}.mp4")
+    maze = SyntheticMaze(ra, DEFAULT_MASKS, width, height, seed=seed)
+    config = ra.config
+    written = maze.write(video_path, n_frames, script, config.frame_gap)
+
+    before = stage_totals()
+    stages = {}
+
+    md, elapsed, peak = measure(
+        lambda: movementDetectionModel(video_path, frame_gap=config.frame_gap, brightness=config.brightness),
+        trace_memory,
+    )
+    frames = len(md.video)
+    stages["decode"] = {"seconds": elapsed, "fps": frames / elapsed, "peak_mb": peak / 1024**2}
+
+    trace, elapsed, peak = measure(
+        lambda: ra.detect_video(md, config),
+        trace_memory,
+    )
+    stages["detect"] = {"seconds": elapsed, "fps": len(trace) / elapsed, "peak_mb": peak / 1024**2}
+
+    chunked_match = None
+    if workers:
+        # decode + detect across processes, compared against the sequential trace
+        chunked, elapsed, _ = measure(lambda: ra.detect_chunked(video_path, config, n_workers=workers), False)
+        stages["chunked"] = {"seconds": elapsed, "fps": len(chunked) / elapsed, "workers": workers}
+        chunked_match = same_trace(trace, chunked)
+
+    scored, elapsed, peak = measure(lambda: ra.score_arms(trace, DEFAULT_MASKS, rules=config.arm_rules()), trace_memory)
+    stages["arms"] = {"seconds": elapsed, "fps": len(trace) / elapsed, "peak_mb": peak / 1024**2}
+
+    if render:
+        _, elapsed, peak = measure(
+            lambda: ra.render_video(md, trace, DEFAULT_MASKS, os.path.basename(video_path), rules=config.arm_rules()),
+            trace_memory,
+        )
+        stages["render"] = {"seconds": elapsed, "fps": len(trace) / elapsed, "peak_mb": peak / 1024**2}
+
+    after = stage_totals()
+    right, wrong = expected_counts(script)
+    # video frames covered, so presets with different frame_gap compare on the same footage
+    source_frames = (written + 1) * config.frame_gap
+    total = sum(stage["seconds"] for name, stage in stages.items() if name != "chunked")
+    return {
+        "resolution": [width, height],
+        "frames": frames,
+        "written_frames": written,
+        "source_frames": source_frames,
+        "source_fps": source_frames / total,
+        "stages": stages,
+        "stage_seconds": {stage: after[stage] - before.get(stage, 0.0) for stage in after},
+        "right": scored["right"],
+        "wrong": scored["wrong"],
+        "expected_right": right,
+        "expected_wrong": wrong,
+        "counts_match": scored["right"] == right and scored["wrong"] == wrong,
+        "chunked_match": chunked_match,
+    }
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the RAM pipeline on synthetic maze videos")
+    parser.add_argument("--dataset", default="merged_classification.csv")
+    # the forest classifies boxes by absolute pixel position and size learned
+    # from 1280x720 recordings, so arm counts are only expected to match there
+    parser.add_argument("--resolutions", default="1280x720", help="WxH list; counts are only reliable at the 1280x720 training resolution")
+    parser.add_argument("--lengths", default="240,480", help="sampled frames per video")
+    parser.add_argument("--script", default=",".join(map(str, DEFAULT_SCRIPT)), help="arm visit order")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--preset", default="default", choices=sorted(PRESETS), help="detector/forest preset to benchmark")
+    parser.add_argument("--no-render", action="store_true")
+    parser.add_argument("--no-tracking", action="store_true", help="always scan the full frame")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (faster, no peak_mb)")
+    parser.add_argument("--workers", type=int, default=0, help="also time chunked parallel detection with this many processes")
+    parser.add_argument("--output", default="benchmarkResults")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    script = [int(arm) for arm in args.script.split(",")]
+    config = AnalysisConfig.preset(args.preset, tracking=not args.no_tracking)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        ra = RAM_Analysis(args.dataset, output_dir=os.path.join(workdir, "output"), cache_dir=os.path.join(workdir, "cache"), config=config)
+        train_seconds = time.perf_counter() - start
+
+        cases = []
+        for resolution in args.resolutions.split(","):
+            width, height = (int(v) for v in resolution.lower().split("x"))
+            for n_frames in (int(v) for v in args.lengths.split(",")):
+                case = run_case(ra, workdir, width, height, n_frames, script, args.seed, not args.no_render, not args.no_memory, args.workers)
+                cases.append(case)
+                print(f"\n{width}x{height} x{case['frames']}: "
+                      + ", ".join(f"{name} {stage['fps']:.1f} fps" for name, stage in case["stages"].items())
+                      + f" | video {case['source_fps']:.1f} fps"
+                      + f" | right {case['right']}/{case['expected_right']} wrong {case['wrong']}/{case['expected_wrong']}"
+                      + ("" if case["chunked_match"] is None else f" | chunked match: {case['chunked_match']}"))
+
+    os.makedirs(args.output, exist_ok=True)
+    result = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment(),
+        "preset": args.preset,
+        "config": config.to_dict(),
+        "seed": args.seed,
+        "script": script,
+        "train_seconds": train_seconds,
+        "cases": cases,
+    }
+    path = os.path.join(args.output, datetime.now().strftime("%Y-%m-%d_%H-%M-%S") + ".json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {path}")
+
+    mismatched = [case for case in cases if not case["counts_match"] or case["chunked_match"] is False]
+    if mismatched:
+        for case in mismatched:
+            width, height = case["resolution"]
+            print(f"MISMATCH {width}x{height} x{case['frames']}: right {case['right']}/{case['expected_right']} "
+                  f"wrong {case['wrong']}/{case['expected_wrong']}, chunked match: {case['chunked_match']}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import math
+
+
+class BoxTracker:
+    """
+    Constant-velocity (alpha-beta) track of the detected box centre.
+
+    While the track is alive, detection only scans a grid-aligned window around
+    the predicted position; a miss drops the track and the next frame falls
+    back to a full-frame scan.
+    """
+
+    def __init__(self, alpha:float = 0.85, beta:float = 0.3, margin:float = 1.5, min_half:int = 40):
+        self.alpha = alpha
+        self.beta = beta
+        self.margin = margin
+        self.min_half = min_half
+        self.state = None  # (cx, cy, vx, vy, w, h) or None when lost
+
+    def reset(self):
+        self.state = None
+
+    def predict(self):
+        if self.state is None:
+            return None
+        cx, cy, vx, vy, _, _ = self.state
+        return cx + vx, cy + vy
+
+    def search_window(self, frame_shape:tuple[int,int], grid_size:int):
+        """
+        Grid-aligned (x0, y0, x1, y1) around the predicted centre, or None when
+        the track is lost. Aligning to the grid keeps cell coordinates identical
+        to a full-frame scan.
+        """
+        if self.state is None:
+            return None
+        h, w = frame_shape
+        px, py = self.predict()
+        _, _, vx, vy, bw, bh = self.state
+        half_x = max(self.min_half, bw * self.margin + abs(vx))
+        half_y = max(self.min_half, bh * self.margin + abs(vy))
+
+        x0 = max(0, int(math.floor((px - half_x) / grid_size)) * grid_size)
+        y0 = max(0, int(math.floor((py - half_y) / grid_size)) * grid_size)
+        x1 = min(w, int(math.ceil((px + half_x) / grid_size)) * grid_size)
+        y1 = min(h, int(math.ceil((py + half_y) / grid_size)) * grid_size)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return x0, y0, x1, y1
+
+    def update(self, box:tuple):
+        if not box:
+            self.state = None
+            return
+
+        min_x, min_y, max_x, max_y = box
+        mx, my = (min_x + max_x) / 2, (min_y + max_y) / 2
+        bw, bh = max_x - min_x, max_y - min_y
+
+        if self.state is None:
+            self.state = (mx, my, 0.0, 0.0, bw, bh)
+            return
+
+        px, py = self.predict()
+        _, _, vx, vy, _, _ = self.state
+        rx, ry = mx - px, my - py
+        self.state = (
+            px + self.alpha * rx,
+            py + self.alpha * ry,
+            vx + self.beta * rx,
+            vy + self.beta * ry,
+            bw,
+            bh,
+        )
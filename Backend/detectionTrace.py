@@ -0,0 +1,99 @@
+import numpy as np
+
+
+class DetectionTrace:
+    """
+    Columnar per-frame detection results of one video.
+
+    Row i describes the frame pair (video[i], video[i+1]): the bounding box
+    (-1 when nothing moved), the RF label (-1 when unclassified), the class
+    probabilities and the active grid cells of the selected cluster.
+    """
+
+    def __init__(self, n_frames:int, grid_size:int, frame_shape:tuple[int,int]):
+        self.grid_size = grid_size
+        self.frame_shape = frame_shape
+        self.boxes = np.full((n_frames, 4), -1, dtype=np.int32)
+        self.pred = np.full(n_frames, -1, dtype=np.int8)
+        self.prob = np.zeros((n_frames, 2), dtype=np.float32)
+        self.cell_offsets = np.zeros(n_frames + 1, dtype=np.int32)
+        self._cells = []
+        self.cells = np.zeros((0, 2), dtype=np.int32)
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def set_detection(self, frameIdx:int, box:tuple, cells:list):
+        if box:
+            self.boxes[frameIdx] = box
+        self._cells.append(np.asarray(cells, dtype=np.int32).reshape(-1, 2))
+        self.cell_offsets[frameIdx + 1] = self.cell_offsets[frameIdx] + len(cells)
+
+    def set_label(self, frameIdx:int, pred:int, prob):
+        self.pred[frameIdx] = pred
+        self.prob[frameIdx] = prob
+
+    def classify(self, predict_boxes, start:int = 0, stop:int = None) -> np.ndarray:
+        """
+        Label every detected box in rows [start, stop) with a single batched
+        predict_boxes(boxes) -> (pred, prob) call. Returns the labeled rows.
+        """
+        stop = len(self) if stop is None else stop
+        rows = start + np.flatnonzero(self.boxes[start:stop, 0] >= 0)
+        if len(rows):
+            pred, prob = predict_boxes(self.boxes[rows])
+            self.pred[rows] = pred
+            self.prob[rows] = prob
+        return rows
+
+    def finalize(self):
+        if self._cells:
+            self.cells = np.concatenate(self._cells)
+            self._cells = []
+        return self
+
+    def box(self, frameIdx:int):
+        if self.boxes[frameIdx, 0] < 0:
+            return ()
+        return tuple(int(v) for v in self.boxes[frameIdx])
+
+    def frame_cells(self, frameIdx:int):
+        if self._cells:
+            # still being filled in (streaming detection)
+            return self._cells[frameIdx]
+        return self.cells[self.cell_offsets[frameIdx]:self.cell_offsets[frameIdx + 1]]
+
+    def truncate(self, n_frames:int):
+        """
+        Drop rows past n_frames, e.g. when decoding stopped early.
+        """
+        self.finalize()
+        self.boxes = self.boxes[:n_frames]
+        self.pred = self.pred[:n_frames]
+        self.prob = self.prob[:n_frames]
+        self.cell_offsets = self.cell_offsets[:n_frames + 1]
+        self.cells = self.cells[:self.cell_offsets[-1]]
+        return self
+
+    def save(self, path:str):
+        np.savez_compressed(
+            path,
+            grid_size=self.grid_size,
+            frame_shape=np.array(self.frame_shape),
+            boxes=self.boxes,
+            pred=self.pred,
+            prob=self.prob,
+            cell_offsets=self.cell_offsets,
+            cells=self.finalize().cells,
+        )
+
+    @classmethod
+    def load(cls, path:str):
+        data = np.load(path)
+        trace = cls(len(data["boxes"]), int(data["grid_size"]), tuple(int(v) for v in data["frame_shape"]))
+        trace.boxes = data["boxes"]
+        trace.pred = data["pred"]
+        trace.prob = data["prob"]
+        trace.cell_offsets = data["cell_offsets"]
+        trace.cells = data["cells"]
+        return trace
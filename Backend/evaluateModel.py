@@ -0,0 +1,64 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from randomForest import NoiseFilter, read_labeled_boxes, classification_metrics, FEATURES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a NoiseFilter model on a held-out labeled box CSV")
+    parser.add_argument("csv", help="held-out CSV with min_x,min_y,max_x,max_y,label")
+    parser.add_argument("--model", help="model saved with NoiseFilter.save()")
+    parser.add_argument("--train", help="train a fresh model from this CSV instead of loading one")
+    parser.add_argument("--n-trees", type=int, default=50, help="forest size for --train")
+    parser.add_argument("--max-depth", type=int, default=12, help="tree depth for --train")
+    parser.add_argument("--save", help="save the freshly trained model here")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    if args.model:
+        nf = NoiseFilter.load(args.model)
+    elif args.train:
+        nf = NoiseFilter(args.train, n_trees=args.n_trees, max_depth=args.max_depth)
+        nf.train()
+        if args.save:
+            nf.save(args.save)
+    else:
+        parser.error("either --model or --train is required")
+
+    boxes, labels = read_labeled_boxes(args.csv)
+
+    # one batched pass over every box
+    start = time.perf_counter()
+    pred, _ = nf.predict_boxes(boxes)
+    elapsed = time.perf_counter() - start
+
+    report = {
+        "model_version": nf.version,
+        "n_trees": len(nf.model.trees),
+        "max_depth": nf.model.max_depth,
+        "held_out": classification_metrics(labels, pred),
+        "oob": nf.model.oob_metrics,
+        "feature_importances": dict(zip(FEATURES, np.round(nf.model.feature_importances, 4).tolist())),
+        "latency_us_per_box": elapsed / max(len(boxes), 1) * 1e6,
+    }
+
+    held_out = report["held_out"]
+    print(f"\nModel {report['model_version']} ({report['n_trees']} trees, depth {report['max_depth']})")
+    print(f"Held-out: n={held_out['n']} accuracy={held_out['accuracy']:.4f} "
+          f"precision={held_out['precision']:.4f} recall={held_out['recall']:.4f}")
+    if report["oob"]:
+        oob = report["oob"]
+        print(f"OOB:      n={oob['n']} accuracy={oob['accuracy']:.4f} "
+              f"precision={oob['precision']:.4f} recall={oob['recall']:.4f}")
+    print(f"Latency:  {report['latency_us_per_box']:.1f} us/box")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
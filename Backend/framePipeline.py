@@ -0,0 +1,166 @@
+import functools
+
+import cv2
+import numpy as np
+
+from movementDetector import movementDetectionModel
+from boxTracker import BoxTracker
+from detectionTrace import DetectionTrace
+from randomForest import box_features
+
+
+def probe_video(video_path:str, step:int):
+    """
+    (n_samples, frame_shape) of the frames movementDetectionModel would keep.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Error opening video {video_path}")
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    ret, frame = cap.read()
+    cap.release()
+    if not ret:
+        raise ValueError(f"Video has no readable frames: {video_path}")
+    return len(range(step, total_frames, step)), frame.shape
+
+
+def sample_positions(cap, step:int) -> range:
+    """
+    Source frame positions of the samples movementDetectionModel keeps (it
+    drops the first sampled frame).
+    """
+    return range(step, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), step)
+
+
+def read_sample(cap, samples:range, sample_idx:int, brightness:float):
+    """
+    Seek to and decode one sample exactly like preparingVideo; None past the end.
+    """
+    if sample_idx >= len(samples):
+        return None
+    cap.set(cv2.CAP_PROP_POS_FRAMES, samples[sample_idx])  # jump to frame
+    ret, frame = cap.read()
+    if not ret:
+        return None
+    return cv2.convertScaleAbs(frame, alpha=brightness)
+
+
+def predict_boxes(forest, boxes):
+    return forest.predict_with_proba(box_features(boxes))
+
+
+def classify(forest, box:tuple):
+    """
+    (pred, prob) of one detected box, or (-1, (0, 0)) when nothing moved.
+    """
+    if not box:
+        return -1, (0.0, 0.0)
+    preds, probs = forest.predict_with_proba(box_features(box))
+    return int(preds[0]), tuple(probs[0])
+
+
+def decode_worker(ring, filled, video_path:str, step:int, brightness:float, start:int = 0, stop:int = None):
+    """
+    Decode every step-th frame into free ring slots and announce (index, slot)
+    on `filled`, followed by None. Sample indices match movementDetectionModel;
+    start/stop select a sample range.
+    """
+    cap = cv2.VideoCapture(video_path)
+    samples = sample_positions(cap, step)
+    stop = len(samples) if stop is None else min(stop, len(samples))
+
+    for sample_idx in range(start, stop):
+        frame = read_sample(cap, samples, sample_idx, brightness)
+        if frame is None:
+            break
+        slot = ring.take()
+        np.copyto(ring.frames[slot], frame)
+        filled.put((sample_idx, slot))
+
+    cap.release()
+    filled.put(None)
+
+
+def detect_worker(ring, filled, detected, forest, config):
+    """
+    Run motion detection and RF classification on consecutive ring frames.
+
+    Emits (frameIdx, box, cells, pred, prob, slot) on `detected`, where slot
+    holds the current frame of that pair and ownership passes to the reader.
+    A slot is forwarded only once it is no longer needed as the previous
+    frame, so rows arrive one frame late but in order. Ends with None.
+    """
+    md = movementDetectionModel(None)
+    tracker = BoxTracker() if config.tracking else None
+    prev_slot = None
+    pending = None
+
+    for sample_idx, slot in iter(filled.get, None):
+        if prev_slot is None:
+            prev_slot = slot
+            continue
+
+        cells, box = md.detect_tracked(ring.frames[prev_slot], ring.frames[slot], tracker, grid_size=config.grid_size, threshold=config.threshold, black_threshold=config.black_threshold)
+        pred, prob = classify(forest, box)
+
+        # prev_slot is done being a "previous frame": hand it to the reader
+        # with the row it is the current frame of (the first frame has none)
+        if pending is None:
+            ring.release(prev_slot)
+        else:
+            detected.put(pending + (prev_slot,))
+        pending = (sample_idx - 1, box, cells, pred, prob)
+        prev_slot = slot
+
+    if pending is not None:
+        detected.put(pending + (prev_slot,))
+    elif prev_slot is not None:
+        ring.release(prev_slot)
+    detected.put(None)
+
+
+def split_rows(n_rows:int, n_segments:int, min_rows:int = 16) -> list[tuple[int,int]]:
+    """
+    Split detection rows [0, n_rows) into at most n_segments contiguous
+    (start, stop) ranges of at least min_rows rows each.
+    """
+    n_segments = max(1, min(n_segments, n_rows // min_rows))
+    bounds = np.linspace(0, n_rows, n_segments + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def detect_segment(video_path:str, forest, config, start:int, stop:int):
+    """
+    Detection rows [start, stop) of one video, run independently of the rest.
+    Boxes are classified in one batch at the end.
+
+    Decodes samples start..stop (the last one overlaps the next segment's
+    first) and starts with a lost tracker. Returns (trace, states, final):
+    a DetectionTrace indexed from 0, the tracker state before each row and
+    the state after the last one, so the caller can tell from which row on
+    the segment agrees with a sequential run. The trace is shorter than
+    stop - start when the video ends early.
+    """
+    cap = cv2.VideoCapture(video_path)
+    samples = sample_positions(cap, config.frame_gap)
+    md = movementDetectionModel(None)
+    tracker = BoxTracker() if config.tracking else None
+    prev = read_sample(cap, samples, start, config.brightness)
+    trace = DetectionTrace(stop - start, config.grid_size, prev.shape[:2] if prev is not None else (0, 0))
+    states = []
+
+    n_rows = 0
+    if prev is not None:
+        for row in range(start, stop):
+            curr = read_sample(cap, samples, row + 1, config.brightness)
+            if curr is None:
+                break
+            states.append(tracker.state if tracker is not None else None)
+            cells, box = md.detect_tracked(prev, curr, tracker, grid_size=config.grid_size, threshold=config.threshold, black_threshold=config.black_threshold)
+            trace.set_detection(row - start, box, cells)
+            prev = curr
+            n_rows += 1
+
+    cap.release()
+    trace.truncate(n_rows).classify(functools.partial(predict_boxes, forest))
+    return trace, states, (tracker.state if tracker is not None else None)
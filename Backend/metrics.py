@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value:float):
+        self.total += value
+        self.n += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Metrics:
+    """
+    Process-wide counters and latency histograms for the video pipeline,
+    rendered in the Prometheus text exposition format.
+
+    Stage timers also add their duration to the current frame record (see
+    begin_frame/end_frame) so a job trace can break each frame down by stage.
+    """
+
+    def __init__(self, prefix:str = "ram"):
+        self.prefix = prefix
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name:str, value:float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name:str, value:float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, stage:str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_seconds", elapsed, stage=stage)
+            record = getattr(self._local, "frame", None)
+            if record is not None:
+                record[stage] = record.get(stage, 0.0) + elapsed
+
+    def begin_frame(self, **fields):
+        self._local.frame = dict(fields)
+        self._local.frame_start = time.perf_counter()
+        return self._local.frame
+
+    def end_frame(self, stage:str):
+        record = self._local.frame
+        elapsed = time.perf_counter() - self._local.frame_start
+        record["seconds"] = elapsed
+        self.observe("frame_seconds", elapsed, stage=stage)
+        self._local.frame = None
+        return record
+
+    def render_prometheus(self) -> str:
+        def fmt_labels(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {self.prefix}_{name}_total counter")
+                for (n, labels), value in sorted(self.counters.items()):
+                    if n == name:
+                        lines.append(f"{self.prefix}_{name}_total{fmt_labels(labels)} {value}")
+
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for (n, labels), hist in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', bound)])} {cumulative}")
+                    lines.append(f"{metric}_bucket{fmt_labels(labels, [('le', '+Inf')])} {hist.n}")
+                    lines.append(f"{metric}_sum{fmt_labels(labels)} {hist.total}")
+                    lines.append(f"{metric}_count{fmt_labels(labels)} {hist.n}")
+        return "\n".join(lines) + "\n"
+
+
+class JobTrace:
+    """
+    Optional per-job JSON-lines trace of per-frame stage timings and counts.
+    """
+
+    def __init__(self, path:str = None):
+        self.file = open(path, "w") if path else None
+
+    def record(self, event:dict):
+        if self.file is not None:
+            self.file.write(json.dumps(event) + "\n")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+metrics = Metrics()
@@ -1,8 +1,11 @@
-import cv2, numpy as np,sys
+import cv2, numpy as np,sys,logging
+from metrics import metrics
 
+logger = logging.getLogger(__name__)
 
 class movementDetectionModel:
     def __init__(self,video_path,frame_gap = 5,brightness = 6):
+        self._last_progress = None
         if (video_path != None):
             self.video = self.preparingVideo(video_path,frame_gap,brightness = brightness)[1:]
             self.total_frame = len(self.video)
@@ -12,39 +15,47 @@ class movementDetectionModel:
         self.box = ()
         
     def draw_grid_difference(self,prev_frame, curr_frame, grid_size=60, threshold = 50,show_grid = False):
-        gray_prev = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-        gray_curr = cv2.cvtColor(curr_frame, cv2.COLOR_BGR2GRAY)
-        diff = cv2.absdiff(gray_curr, gray_prev)
-        diff_norm = cv2.normalize(diff, None, 0, 255, cv2.NORM_MINMAX)
-        overlay = curr_frame.copy()
-        h, w = diff.shape
+        self.detect_movement(prev_frame,curr_frame,grid_size=grid_size,threshold=threshold)
+        return self.draw_detection(curr_frame,self.cleaned_position_log,self.box,grid_size=grid_size,show_grid=show_grid)
+
+    def detect_movement(self,prev_frame, curr_frame, grid_size=60, threshold = 50, window = None, black_threshold = 50):
+        """
+        Find the moving dark blob between two frames. `window` (x0, y0, x1, y1,
+        grid-aligned) restricts the grid scan to a region; the difference is
+        still normalised over the whole frame so cell values match a full scan.
+        """
+        with metrics.timer("gray_diff"):
+            gray_prev = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
+            gray_curr = cv2.cvtColor(curr_frame, cv2.COLOR_BGR2GRAY)
+            diff = cv2.absdiff(gray_curr, gray_prev)
+            diff_norm = cv2.normalize(diff, None, 0, 255, cv2.NORM_MINMAX)
+            h, w = diff.shape
                
+        x0, y0, x1, y1 = window if window is not None else (0, 0, w, h)
         rawPosLog = []
-        black_threshold = 50  # <-- adjust as needed
-        for y in range(0, h, grid_size):
-            for x in range(0, w, grid_size):
-                y_end, x_end = min(y + grid_size, h), min(x + grid_size, w)
-                
-                # movement intensity (difference)
-                cell_diff = np.mean(diff_norm[y:y_end, x:x_end])
-                intensity = int(np.clip(cell_diff, 0, 255))
+        with metrics.timer("grid_scan"):
+            for y in range(y0, y1, grid_size):
+                for x in range(x0, x1, grid_size):
+                    y_end, x_end = min(y + grid_size, h), min(x + grid_size, w)
+                    
+                    # movement intensity (difference)
+                    cell_diff = np.mean(diff_norm[y:y_end, x:x_end])
+                    intensity = int(np.clip(cell_diff, 0, 255))
 
-                # brightness check (is current frame pixel black)
-                avg_pixel = np.mean(gray_curr[y:y_end, x:x_end])
+                    # brightness check (is current frame pixel black)
+                    avg_pixel = np.mean(gray_curr[y:y_end, x:x_end])
 
-                # ✅ Only count movement if intensity is high AND pixel is black
-                if intensity > threshold and avg_pixel < black_threshold:
-                    rawPosLog.append((x, y))
-                    
-        self.cleaned_position_log = self.cleaningPosLog(rawPosLog)        
+                    # ✅ Only count movement if intensity is high AND pixel is black
+                    if intensity > threshold and avg_pixel < black_threshold:
+                        rawPosLog.append((x, y))
+
+        with metrics.timer("clustering"):
+            self.cleaned_position_log = self.cleaningPosLog(rawPosLog)
+        metrics.inc("active_cells", len(rawPosLog))
+        metrics.inc("clustered_cells", len(self.cleaned_position_log))
 
         self.box = ()
         if self.cleaned_position_log:
-            for position in self.cleaned_position_log:
-                x,y = position[0], position[1]
-                x_end,y_end = x+grid_size, y+grid_size
-                cv2.rectangle(overlay, (x, y), (x_end, y_end), (0, 255, 0), -1)
-            
             min_x = self.cleaned_position_log[0][0]
             min_y = self.cleaned_position_log[0][1]
             max_x = min_x+grid_size
@@ -57,8 +68,40 @@ class movementDetectionModel:
                 if (y+grid_size > max_y): max_y = y+grid_size
             
             self.box = (min_x,min_y,max_x,max_y)
-            
-            cv2.rectangle(overlay, (min_x, min_y), (max_x, max_y), (0, 255, 255), 3)  # yellow rectangle
+
+        return self.cleaned_position_log, self.box
+
+    def detect_tracked(self,prev_frame, curr_frame, tracker, grid_size=60, threshold = 50, black_threshold = 50):
+        """
+        detect_movement around the tracker's predicted position first, falling
+        back to a full-frame scan when the track is lost. tracker may be None.
+        """
+        window = None
+        if tracker is not None:
+            window = tracker.search_window(curr_frame.shape[:2],grid_size)
+
+        cells, box = self.detect_movement(prev_frame,curr_frame,grid_size=grid_size,threshold=threshold,window=window,black_threshold=black_threshold)
+        if window is not None:
+            if box:
+                metrics.inc("track_frames",result="hit")
+            else:
+                metrics.inc("track_frames",result="lost")
+                cells, box = self.detect_movement(prev_frame,curr_frame,grid_size=grid_size,threshold=threshold,black_threshold=black_threshold)
+
+        if tracker is not None:
+            tracker.update(box)
+        return cells, box
+
+    def draw_detection(self,curr_frame, cells, box, grid_size=60, show_grid = False):
+        overlay = curr_frame.copy()
+        h, w = curr_frame.shape[:2]
+
+        for x,y in cells:
+            x,y = int(x), int(y)
+            cv2.rectangle(overlay, (x, y), (x+grid_size, y+grid_size), (0, 255, 0), -1)
+
+        if box:
+            cv2.rectangle(overlay, (box[0], box[1]), (box[2], box[3]), (0, 255, 255), 3)  # yellow rectangle
 
         result = cv2.addWeighted(overlay, 0.5, curr_frame, 0.5, 0)
 
@@ -108,7 +151,7 @@ class movementDetectionModel:
         cap = cv2.VideoCapture(video_path)
 
         if not cap.isOpened():
-            print("Error opening video")
+            logger.error("Error opening video %s", video_path)
             exit()
 
         selected_frames = []
@@ -116,12 +159,13 @@ class movementDetectionModel:
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         
         for frame_index in range(0, total_frames, step):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)  # jump to frame
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame = cv2.convertScaleAbs(frame,alpha=brightness)
+            with metrics.timer("decode"):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)  # jump to frame
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                frame = cv2.convertScaleAbs(frame,alpha=brightness)
             selected_frames.append(frame)
             self.progress_bar(frame_index+1,total_frames,message="🎬 Preparing Video ")
             
@@ -131,7 +175,13 @@ class movementDetectionModel:
         return selected_frames
     
     def progress_bar(self,progress, total,message="",bar_length=40):
+        if not logger.isEnabledFor(logging.INFO):
+            return
         fraction = progress / total
+        # only redraw when the shown percentage changes
+        if int(fraction * 100) == self._last_progress and progress != total:
+            return
+        self._last_progress = int(fraction * 100)
         arrow = int(fraction * bar_length) * '='
         padding = (bar_length - len(arrow)) * '-'
 
@@ -141,6 +191,7 @@ class movementDetectionModel:
         sys.stdout.flush()
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     videos_path = [
         r"E:\data datathon\RAM video\A4_Hari 10.mp4",
         r"E:\data datathon\drive-download-20250625T145832Z-1-004\B3_Hari 10.mp4",
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class OutputCatalog:
+    """
+    SQLite index of processed videos, updated when a job finishes so listing
+    results never has to scan the output folder.
+    """
+
+    VIDEO_EXT = ('.mp4', '.avi', '.mov', '.mkv', ".webm")
+
+    def __init__(self, db_path:str, output_dir:str):
+        self.output_dir = output_dir
+        self.preview_dir = os.path.join(output_dir, "previews")
+        os.makedirs(self.preview_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    job_id TEXT PRIMARY KEY,
+                    video TEXT UNIQUE NOT NULL,
+                    source TEXT,
+                    duration REAL,
+                    frames INTEGER,
+                    right_count INTEGER,
+                    wrong_count INTEGER,
+                    size INTEGER,
+                    created REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS results_created ON results(created)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS results_source ON results(source)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('version', 0)")
+
+        if self.count() == 0:
+            self.sync_directory()
+
+    def video_path(self, video:str) -> str:
+        return os.path.join(self.output_dir, os.path.basename(video))
+
+    def poster_path(self, video:str) -> str:
+        return os.path.join(self.preview_dir, os.path.splitext(os.path.basename(video))[0] + ".jpg")
+
+    def preview_path(self, video:str) -> str:
+        return os.path.join(self.preview_dir, os.path.splitext(os.path.basename(video))[0] + "_preview.webm")
+
+    def _bump_version(self):
+        self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def add(self, job_id:str, video:str, source:str = None, duration:float = None, frames:int = None, right:int = None, wrong:int = None):
+        path = os.path.join(self.output_dir, video)
+        size = os.path.getsize(path) if os.path.exists(path) else None
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?,?,?,?,?,?,?,?,?)",
+                (job_id, video, source, duration, frames, right, wrong, size, time.time()),
+            )
+            self._bump_version()
+
+    def remove_video(self, video:str):
+        with self._lock, self.conn:
+            if self.conn.execute("DELETE FROM results WHERE video = ?", (os.path.basename(video),)).rowcount:
+                self._bump_version()
+
+    def sync_directory(self):
+        """
+        Register videos already in the output folder (e.g. produced before the
+        catalog existed). Their counts stay unknown.
+        """
+        if not os.path.isdir(self.output_dir):
+            return
+        with self._lock, self.conn:
+            for f in os.listdir(self.output_dir):
+                if not f.lower().endswith(self.VIDEO_EXT):
+                    continue
+                stat = os.stat(os.path.join(self.output_dir, f))
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO results (job_id, video, size, created) VALUES (?,?,?,?)",
+                    (os.path.splitext(f)[0], f, stat.st_size, stat.st_mtime),
+                )
+            self._bump_version()
+
+    def query(self, offset:int = 0, limit:int = 50, source:str = None, since:float = None) -> tuple[int, list[dict]]:
+        where, args = [], []
+        if source:
+            where.append("source LIKE ?")
+            args.append(f"%{source}%")
+        if since is not None:
+            where.append("created >= ?")
+            args.append(since)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        with self._lock:
+            total = self.conn.execute(f"SELECT COUNT(*) FROM results {clause}", args).fetchone()[0]
+            rows = self.conn.execute(
+                f"SELECT * FROM results {clause} ORDER BY created DESC LIMIT ? OFFSET ?",
+                args + [limit, offset],
+            ).fetchall()
+
+        items = [
+            {
+                "job_id": row["job_id"],
+                "path": f"output/{row['video']}",
+                "stream": f"/results/{row['video']}",
+                "poster": f"/results/{row['video']}/poster",
+                "preview": f"/results/{row['video']}/preview",
+                "source": row["source"],
+                "duration": row["duration"],
+                "frames": row["frames"],
+                "right": row["right_count"],
+                "wrong": row["wrong_count"],
+                "size": row["size"],
+                "created": row["created"],
+            }
+            for row in rows
+        ]
+        return total, items
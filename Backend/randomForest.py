@@ -2,14 +2,42 @@ import numpy as np
 import pandas as pd
 import random
 import sys
+import hashlib
+import logging
+import os
+import pickle
 from collections import Counter
 
+logger = logging.getLogger(__name__)
+
+
+def classification_metrics(y_true, y_pred, positive=1) -> dict:
+    """
+    Accuracy, precision and recall of the positive class (1 = Valid), computed
+    on whole arrays at once.
+    """
+    y_true = np.asarray(y_true)
+    y_pred = np.asarray(y_pred)
+    tp = int(np.sum((y_pred == positive) & (y_true == positive)))
+    fp = int(np.sum((y_pred == positive) & (y_true != positive)))
+    fn = int(np.sum((y_pred != positive) & (y_true == positive)))
+    tn = int(np.sum((y_pred != positive) & (y_true != positive)))
+    n = len(y_true)
+    return {
+        "n": n,
+        "accuracy": (tp + tn) / n if n else 0.0,
+        "precision": tp / (tp + fp) if tp + fp else 0.0,
+        "recall": tp / (tp + fn) if tp + fn else 0.0,
+        "confusion": {"tp": tp, "fp": fp, "fn": fn, "tn": tn},
+    }
+
 
 class DecisionTree:
     def __init__(self, max_depth=10, min_samples_split=5):
         self.max_depth = max_depth
         self.min_samples_split = min_samples_split
         self.tree = None
+        self.feature_importances = None
 
     def gini(self, y):
         classes = np.unique(y)
@@ -45,16 +73,19 @@ class DecisionTree:
                     best_feature = feature
                     best_thresh = t
 
-        return best_feature, best_thresh
+        return best_feature, best_thresh, best_gini
 
     def build_tree(self, X, y, depth=0):
         if len(set(y)) == 1 or depth >= self.max_depth or len(y) < self.min_samples_split:
             return Counter(y).most_common(1)[0][0]
 
-        feature, threshold = self.best_split(X, y)
+        feature, threshold, split_gini = self.best_split(X, y)
         if feature is None:
             return Counter(y).most_common(1)[0][0]
 
+        # weighted gini decrease credited to the split feature
+        self.feature_importances[feature] += len(y) * (self.gini(y) - split_gini)
+
         X_left, y_left, X_right, y_right = self.split_data(X, y, feature, threshold)
 
         return {
@@ -65,6 +96,7 @@ class DecisionTree:
         }
 
     def fit(self, X, y):
+        self.feature_importances = np.zeros(X.shape[1])
         self.tree = self.build_tree(X, y)
 
     def predict_one(self, x, tree):
@@ -75,8 +107,20 @@ class DecisionTree:
         else:
             return self.predict_one(x, tree["right"])
 
+    def predict_rows(self, X, rows, tree, out):
+        if not isinstance(tree, dict):
+            out[rows] = tree
+            return
+        go_left = X[rows, tree["feature"]] <= tree["threshold"]
+        self.predict_rows(X, rows[go_left], tree["left"], out)
+        self.predict_rows(X, rows[~go_left], tree["right"], out)
+
     def predict(self, X):
-        return np.array([self.predict_one(x, self.tree) for x in X])
+        # route all rows down the tree together, one mask per node
+        out = np.empty(len(X), dtype=np.int64)
+        if len(X):
+            self.predict_rows(X, np.arange(len(X)), self.tree, out)
+        return out
 
 
 class RandomForest:
@@ -84,38 +128,120 @@ class RandomForest:
         self.n_trees = n_trees
         self.max_depth = max_depth
         self.trees = []
+        self.n_samples = 0
+        self.generation = 0
+        self.oob_metrics = None
+        self.feature_importances = None
 
     def bootstrap(self, X, y):
         idxs = np.random.choice(len(X), len(X), replace=True)
-        return X[idxs], y[idxs]
+        return X[idxs], y[idxs], idxs
+
+    def grow_tree(self, X, y):
+        X_sample, y_sample, idxs = self.bootstrap(X, y)
+        tree = DecisionTree(max_depth=self.max_depth)
+        tree.fit(X_sample, y_sample)
+
+        # out-of-bag rows: never drawn for this tree, so they score it fairly
+        in_bag = np.zeros(len(X), dtype=bool)
+        in_bag[idxs] = True
+        tree.oob_idx = np.flatnonzero(~in_bag).astype(np.int32)
+        tree.oob_wrong = int(np.sum(tree.predict(X[tree.oob_idx]) != y[tree.oob_idx]))
+        tree.generation = self.generation
+        return tree
 
     def fit(self, X, y):
         self.trees = []
+        self.n_samples = len(X)
+        self.generation = 0
         for i in range(self.n_trees):
-            X_sample, y_sample = self.bootstrap(X, y)
-            tree = DecisionTree(max_depth=self.max_depth)
-            tree.fit(X_sample, y_sample)
-            self.trees.append(tree)
+            self.trees.append(self.grow_tree(X, y))
             self.progress_bar(i+1,self.n_trees,"🌳 Training Tree")
             # print(f"🌳 Tree {i+1}/{self.n_trees} trained")
+        self.evaluate_oob(X, y)
+
+    def oob_error(self, tree) -> float:
+        return tree.oob_wrong / len(tree.oob_idx) if len(tree.oob_idx) else 0.0
+
+    def update(self, X, y, n_new_trees=10, retire="oob"):
+        """
+        Warm-start refresh after rows were appended to the training set.
+
+        X, y must be the full training set with the previously seen rows first.
+        New rows are out-of-bag for every existing tree, so those trees are
+        rescored on them only. Then n_new_trees are grown on bootstraps of the
+        full set, and the forest is trimmed back to n_trees by retiring the
+        oldest trees (retire="oldest") or those with the highest OOB error
+        (retire="oob").
+        """
+        if not self.trees:
+            self.fit(X, y)
+            return []
+
+        new_idx = np.arange(self.n_samples, len(X), dtype=np.int32)
+        if len(new_idx):
+            X_new, y_new = X[new_idx], y[new_idx]
+            for tree in self.trees:
+                tree.oob_wrong += int(np.sum(tree.predict(X_new) != y_new))
+                tree.oob_idx = np.concatenate([tree.oob_idx, new_idx])
+        self.n_samples = len(X)
+
+        self.generation += 1
+        for i in range(n_new_trees):
+            self.trees.append(self.grow_tree(X, y))
+            self.progress_bar(i+1,n_new_trees,"🌱 Growing Tree")
+
+        n_retire = len(self.trees) - self.n_trees
+        if n_retire <= 0:
+            return []
+        if retire == "oldest":
+            order = sorted(range(len(self.trees)), key=lambda i: self.trees[i].generation)
+        elif retire == "oob":
+            order = sorted(range(len(self.trees)), key=lambda i: -self.oob_error(self.trees[i]))
+        else:
+            raise ValueError(f"Unknown retire policy: {retire}")
+
+        retired = set(order[:n_retire])
+        retired_trees = [self.trees[i] for i in sorted(retired)]
+        self.trees = [tree for i, tree in enumerate(self.trees) if i not in retired]
+        self.evaluate_oob(X, y)
+        return retired_trees
+
+    def evaluate_oob(self, X, y):
+        """
+        Out-of-bag estimate of forest quality: every row is voted on only by
+        the trees that never saw it. Also aggregates feature importances.
+        """
+        votes = np.zeros((len(X), 2), dtype=np.int32)
+        for tree in self.trees:
+            preds = tree.predict(X[tree.oob_idx])
+            np.add.at(votes, (tree.oob_idx, preds), 1)
+
+        voted = votes.sum(axis=1) > 0
+        oob_pred = np.argmax(votes[voted], axis=1)
+        self.oob_metrics = classification_metrics(y[voted], oob_pred)
+
+        importances = np.sum([tree.feature_importances for tree in self.trees], axis=0)
+        total = importances.sum()
+        self.feature_importances = importances / total if total > 0 else importances
+        return self.oob_metrics
     
-    def predict(self, X):
-        tree_preds = np.array([tree.predict(X) for tree in self.trees])
-        return np.array([Counter(tree_preds[:, i]).most_common(1)[0][0] for i in range(len(X))])
-
-    def predict_proba(self, X):
+    def predict_with_proba(self, X):
         tree_preds = np.array([tree.predict(X) for tree in self.trees])
-        probs = []
+        prob = np.stack([np.mean(tree_preds == 0, axis=0), np.mean(tree_preds == 1, axis=0)], axis=1)
+        # majority vote; a tie goes to the first tree's label like Counter.most_common
+        pred = np.where(prob[:, 1] > prob[:, 0], 1, np.where(prob[:, 0] > prob[:, 1], 0, tree_preds[0]))
+        return pred, prob
 
-        for i in range(len(X)):
-            counts = Counter(tree_preds[:, i])
-            total = sum(counts.values())
-            prob = [counts.get(0, 0)/total, counts.get(1, 0)/total]
-            probs.append(prob)
+    def predict(self, X):
+        return self.predict_with_proba(X)[0]
 
-        return np.array(probs)
+    def predict_proba(self, X):
+        return self.predict_with_proba(X)[1]
     
     def progress_bar(self,progress, total,message="",bar_length=40):
+        if not logger.isEnabledFor(logging.INFO):
+            return
         fraction = progress / total
         arrow = int(fraction * bar_length) * '='
         padding = (bar_length - len(arrow)) * '-'
@@ -126,43 +252,171 @@ class RandomForest:
         sys.stdout.flush()
 
 
-class NoiseFilter:
-    def __init__(self, csv_path):
-        self.df = pd.read_csv(csv_path)
+BOX_COLUMNS = ["min_x","min_y","max_x","max_y"]
 
-        self.df["width"] = self.df["max_x"] - self.df["min_x"]
-        self.df["height"] = self.df["max_y"] - self.df["min_y"]
-        self.df["area"] = self.df["width"] * self.df["height"]
-        self.df["center_x"] = (self.df["min_x"] + self.df["max_x"]) / 2
-        self.df["center_y"] = (self.df["min_y"] + self.df["max_y"]) / 2
+FEATURES = [
+    "min_x","min_y","max_x","max_y",
+    "width","height","area","center_x","center_y"
+]
 
-        self.features = [
-            "min_x","min_y","max_x","max_y",
-            "width","height","area","center_x","center_y"
-        ]
 
-        self.X = self.df[self.features].values
-        self.y = self.df["label"].values
+def box_features(boxes) -> np.ndarray:
+    """
+    Feature matrix (n, 9) float32 for boxes given as (n, 4) min_x, min_y,
+    max_x, max_y. Shared by training and inference so both see identical values.
+    """
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    features = np.empty((len(boxes), len(FEATURES)), dtype=np.float32)
+    features[:, :4] = boxes
+    features[:, 4] = boxes[:, 2] - boxes[:, 0]
+    features[:, 5] = boxes[:, 3] - boxes[:, 1]
+    features[:, 6] = features[:, 4] * features[:, 5]
+    features[:, 7] = (boxes[:, 0] + boxes[:, 2]) / 2
+    features[:, 8] = (boxes[:, 1] + boxes[:, 3]) / 2
+    return features
 
-        self.model = RandomForest(n_trees=50, max_depth=12)
 
-    def train(self):
-        print("Training Random Forest from scratch...")
-        self.model.fit(self.X, self.y)
+def read_labeled_boxes(csv_path) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Read a labeled box CSV into compact int16 boxes and int8 labels. Accepts
+    both integer and float-formatted files (e.g. the spatially augmented set).
+    """
+    df = pd.read_csv(csv_path, usecols=BOX_COLUMNS + ["label"], dtype=np.float32)
+    boxes = df[BOX_COLUMNS].to_numpy().round().astype(np.int16)
+    labels = df["label"].to_numpy().astype(np.int8)
+    return boxes, labels
 
-    def predict_box(self, min_x, min_y, max_x, max_y):
-        width = max_x - min_x
-        height = max_y - min_y
-        area = width * height
-        center_x = (min_x + max_x) / 2
-        center_y = (min_y + max_y) / 2
 
-        sample = np.array([[min_x,min_y,max_x,max_y,width,height,area,center_x,center_y]])
+def file_digest(path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-        pred = self.model.predict(sample)[0]
-        prob = self.model.predict_proba(sample)[0]
 
-        return pred, prob
+class NoiseFilter:
+    def __init__(self, csv_path, n_trees=50, max_depth=12):
+        self.features = FEATURES
+        self.boxes, self.labels = read_labeled_boxes(csv_path)
+
+        self.model = RandomForest(n_trees=n_trees, max_depth=max_depth)
+        self.model_path = None
+
+        # sources: digests of the CSVs trained on, base set first
+        # data_version: sources + hyperparameters (is a saved model stale?)
+        # version: data_version + the fitted trees, set by train()/update().
+        # Training is unseeded, so two fits of the same data are different models
+        # and must not share cached labels.
+        self.sources = []
+        self._add_source(csv_path)
+
+    def _add_source(self, csv_path):
+        self.sources.append(file_digest(csv_path))
+        data_hash = hashlib.sha256("".join(self.sources).encode()).hexdigest()
+        self.data_version = f"{data_hash[:16]}-t{self.model.n_trees}-d{self.model.max_depth}"
+        self.version = None
+
+    def _fitted(self):
+        forest_hash = hashlib.sha256(pickle.dumps(self.model.trees, protocol=4)).hexdigest()[:12]
+        self.version = f"{self.data_version}-f{forest_hash}"
+
+    def append(self, csv_path):
+        """
+        Merge newly labeled boxes from another CSV without reparsing the
+        existing training set. Call train() afterwards to refit.
+        """
+        boxes, labels = read_labeled_boxes(csv_path)
+        self.boxes = np.concatenate([self.boxes, boxes])
+        self.labels = np.concatenate([self.labels, labels])
+        self._add_source(csv_path)
+        return len(labels)
+
+    def train(self):
+        logger.info("Training Random Forest from scratch...")
+        self.model.fit(box_features(self.boxes), self.labels)
+        self._fitted()
+
+    def update(self, csv_path, n_new_trees=10, retire="oob"):
+        """
+        Append newly labeled boxes and refresh the forest incrementally:
+        grow n_new_trees on the enlarged set and retire as many old trees.
+        Costs roughly n_new_trees/n_trees of a full retrain. A filter that was
+        saved or loaded is saved again to the same path.
+        """
+        n_added = self.append(csv_path)
+        logger.info("Updating Random Forest with %d new rows...", n_added)
+        retired = self.model.update(box_features(self.boxes), self.labels, n_new_trees=n_new_trees, retire=retire)
+        self._fitted()
+        if self.model_path:
+            self.save(self.model_path)
+        return {
+            "added_rows": n_added,
+            "new_trees": n_new_trees,
+            "retired_trees": len(retired),
+            "mean_oob_error": float(np.mean([self.model.oob_error(tree) for tree in self.model.trees])),
+        }
+
+    def predict_box(self, min_x, min_y, max_x, max_y):
+        sample = box_features([min_x, min_y, max_x, max_y])
+
+        pred, prob = self.model.predict_with_proba(sample)
+
+        return pred[0], prob[0]
+
+    def predict_boxes(self, boxes):
+        return self.model.predict_with_proba(box_features(boxes))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump({
+                "model": self.model,
+                "version": self.version,
+                "data_version": self.data_version,
+                "sources": self.sources,
+                "boxes": self.boxes,
+                "labels": self.labels,
+            }, f)
+        self.model_path = path
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a trained filter saved with save(), skipping CSV parsing and training.
+        """
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        nf = cls.__new__(cls)
+        nf.features = FEATURES
+        nf.boxes = state["boxes"]
+        nf.labels = state["labels"]
+        nf.model = state["model"]
+        nf.version = state["version"]
+        nf.data_version = state.get("data_version", state["version"])
+        nf.sources = state.get("sources", [])
+        nf.model_path = path
+        return nf
+
+    @classmethod
+    def load_or_train(cls, csv_path, model_path=None, n_trees=50, max_depth=12):
+        """
+        Reuse the model saved at model_path when it was trained on this CSV
+        (possibly updated with more rows since) with the same hyperparameters;
+        otherwise train and save it there.
+        """
+        if model_path and os.path.exists(model_path):
+            # only the CSV's digest is needed to validate the saved model; the
+            # CSV itself is parsed only when retraining
+            source = file_digest(csv_path)
+            saved = cls.load(model_path)
+            if saved.sources[:1] == [source] and (saved.model.n_trees, saved.model.max_depth) == (n_trees, max_depth):
+                logger.info("Loaded Random Forest %s from %s", saved.version, model_path)
+                return saved
+            logger.info("Saved model %s (%s) is stale for %s, retraining", model_path, saved.data_version, csv_path)
+
+        nf = cls(csv_path, n_trees=n_trees, max_depth=max_depth)
+        nf.train()
+        if model_path:
+            os.makedirs(os.path.dirname(model_path) or ".", exist_ok=True)
+            nf.save(model_path)
+        return nf
 
 # rf = NoiseRFManual("merged_classification.csv")
 # rf.train()
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import threading
+
+from detectionTrace import DetectionTrace
+
+
+class ResultCache:
+    """
+    Content-addressed cache for video analyses.
+
+    Detection traces are keyed by video content, detector parameters and model
+    version, so they survive overlay mask edits. Rendered results are keyed by
+    the trace key plus the mask set. Output videos and traces are evicted
+    least-recently-used once their directory grows past its size budget.
+    """
+
+    def __init__(self, cache_dir:str, output_dir:str, max_output_bytes:int = 2 * 1024**3, max_trace_bytes:int = 256 * 1024**2, max_result_bytes:int = 256 * 1024**2, on_evict = None):
+        self.output_dir = output_dir
+        self.on_evict = on_evict
+        self.trace_dir = os.path.join(cache_dir, "traces")
+        self.result_dir = os.path.join(cache_dir, "results")
+        self.max_output_bytes = max_output_bytes
+        self.max_trace_bytes = max_trace_bytes
+        self.max_result_bytes = max_result_bytes
+        for folder in (self.output_dir, self.trace_dir, self.result_dir):
+            os.makedirs(folder, exist_ok=True)
+
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Keys
+    # -----------------------------
+    def video_hash(self, video_path:str) -> str:
+        stat = os.stat(video_path)
+        memo_key = (os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+        if memo_key in self._hashes:
+            return self._hashes[memo_key]
+
+        digest = hashlib.sha256()
+        with open(video_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+
+        self._hashes[memo_key] = digest.hexdigest()
+        return self._hashes[memo_key]
+
+    def trace_key(self, video_hash:str, params:dict, model_version:str) -> str:
+        payload = json.dumps({"video": video_hash, "params": params, "model": model_version}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def result_key(self, trace_key:str, overlay_mask:list[str], rules:dict = None) -> str:
+        masks = [" ".join(mask.split()) for mask in overlay_mask if mask.strip()]
+        payload = json.dumps({"trace": trace_key, "masks": masks, "rules": rules or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    # -----------------------------
+    # Detection traces
+    # -----------------------------
+    def load_trace(self, key:str):
+        path = os.path.join(self.trace_dir, f"{key}.npz")
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return DetectionTrace.load(path)
+
+    def save_trace(self, key:str, trace:DetectionTrace):
+        trace.save(os.path.join(self.trace_dir, f"{key}.npz"))
+        self._evict(self.trace_dir, self.max_trace_bytes)
+
+    # -----------------------------
+    # Rendered results
+    # -----------------------------
+    def load_result(self, key:str):
+        path = os.path.join(self.result_dir, f"{key}.json")
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            result = json.load(f)
+        os.utime(path)
+        if os.path.exists(self.events_path(key)):
+            os.utime(self.events_path(key))
+
+        video = result.get("video")
+        if video is not None:
+            video_path = os.path.join(self.output_dir, video)
+            if os.path.exists(video_path):
+                os.utime(video_path)
+            else:
+                # rendered video was evicted, only the counts are still valid
+                result["video"] = None
+        return result
+
+    def events_path(self, key:str) -> str:
+        return os.path.join(self.result_dir, f"{key}_events.npz")
+
+    def save_result(self, key:str, result:dict):
+        with open(os.path.join(self.result_dir, f"{key}.json"), "w") as f:
+            json.dump(result, f)
+        # counts and <key>_events.npz arm-visit logs
+        self._evict(self.result_dir, self.max_result_bytes)
+        # only rendered videos have catalog rows and previews to clean up
+        self._evict(self.output_dir, self.max_output_bytes, self.on_evict)
+
+    # -----------------------------
+    # Eviction
+    # -----------------------------
+    def _evict(self, folder:str, max_bytes:int, on_evict = None):
+        with self._lock:
+            entries = []
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                if os.path.isfile(path):
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            entries.sort()
+            # never evict the entry that was just written
+            for _, size, path in entries[:-1]:
+                if total <= max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+                if on_evict is not None:
+                    on_evict(path)
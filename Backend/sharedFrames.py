@@ -0,0 +1,84 @@
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """
+    Fixed ring of frame slots in one shared-memory block.
+
+    Processes pass small slot indices through queues instead of pickling
+    frames; each side reads and writes the slot through a NumPy view. A slot is
+    owned by exactly one process at a time: take() hands out a free slot,
+    release() returns it.
+    """
+
+    def __init__(self, ctx, n_slots:int, frame_shape:tuple, dtype=np.uint8):
+        self.n_slots = n_slots
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        frame_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=frame_bytes * n_slots)
+        self.owner = True
+        self.free_slots = ctx.Queue()
+        for slot in range(n_slots):
+            self.free_slots.put(slot)
+        self._attach_views()
+
+    def _attach_views(self):
+        self.frames = np.ndarray((self.n_slots,) + self.frame_shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    def __getstate__(self):
+        return {
+            "name": self.shm.name,
+            "n_slots": self.n_slots,
+            "frame_shape": self.frame_shape,
+            "dtype": self.dtype.str,
+            "free_slots": self.free_slots,
+        }
+
+    def __setstate__(self, state):
+        self.n_slots = state["n_slots"]
+        self.frame_shape = state["frame_shape"]
+        self.dtype = np.dtype(state["dtype"])
+        self.free_slots = state["free_slots"]
+        try:
+            self.shm = shared_memory.SharedMemory(name=state["name"], track=False)
+        except TypeError:
+            # before Python 3.13 attaching registers the block with the resource
+            # tracker. Spawned children share the parent's tracker, where it is
+            # already registered, so this is harmless; unregistering here would
+            # drop the parent's registration instead.
+            self.shm = shared_memory.SharedMemory(name=state["name"])
+        self.owner = False
+        self._attach_views()
+
+    def take(self, timeout:float = None) -> int:
+        return self.free_slots.get(timeout=timeout)
+
+    def release(self, slot:int):
+        self.free_slots.put(slot)
+
+    def close(self):
+        self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # a caller still holds a frame view; the mapping goes away with it
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+def get_checked(q, processes, timeout:float = 1.0):
+    """
+    queue.get that raises instead of hanging forever when a worker died.
+    """
+    while True:
+        try:
+            return q.get(timeout=timeout)
+        except queue.Empty:
+            for p in processes:
+                if not p.is_alive() and p.exitcode not in (0, None):
+                    raise RuntimeError(f"{p.name} exited with code {p.exitcode}")
@@ -0,0 +1,17 @@
+import pytest
+
+from analysisConfig import AnalysisConfig
+
+
+def test_job_preset_keeps_the_server_forest():
+    config = AnalysisConfig()
+    job = config.for_job(preset="fast")
+    assert job.frame_gap == 10
+    assert (job.n_trees, job.max_depth) == (config.n_trees, config.max_depth)
+    assert config.ignored_fields("fast") == {"n_trees": 20, "max_depth": 10}
+    assert AnalysisConfig.preset("fast").ignored_fields("fast") == {}
+
+
+def test_job_cannot_override_the_forest():
+    with pytest.raises(ValueError):
+        AnalysisConfig().for_job({"n_trees": 10})
@@ -0,0 +1,102 @@
+import random
+
+import cv2
+import numpy as np
+
+from armVisitTracker import ArmVisitTracker, score_trace
+from detectionTrace import DetectionTrace
+from benchmark import DEFAULT_MASKS
+
+SHAPE = (720, 1280)
+
+
+def legacy_counts(boxes, labels, masks, frame_shape):
+    """The armLog/lastArm loop process_video ran before ArmVisitTracker."""
+    h, w = frame_shape
+
+    def polygon(mask):
+        coords = list(map(float, mask.split()[1:]))
+        return np.array([(int(coords[i] * w), int(coords[i+1] * h)) for i in range(0, len(coords), 2)], dtype=np.int32)
+
+    def center(mask):
+        coords = list(map(float, mask.split()[1:]))
+        points = np.array([[coords[i] * w, coords[i+1] * h] for i in range(0, len(coords), 2)])
+        M = cv2.moments(points.astype(np.int32))
+        if M["m00"] == 0:
+            return points.mean(axis=0)
+        return np.array([M["m10"] / M["m00"], M["m01"] / M["m00"]])
+
+    armLog = {}
+    lastArm = None
+    for box, label in zip(boxes, labels):
+        if not box or label == 0:
+            continue
+        cx, cy = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+        inside = False
+        for mask in masks:
+            if cv2.pointPolygonTest(polygon(mask), (int(cx), int(cy)), False) >= 0:
+                inside = mask
+                break
+        if inside is False:
+            lastArm = None
+            continue
+        mx, my = center(inside)
+        distance = np.sqrt((int(mx) - cx) ** 2 + (int(my) - cy) ** 2) / 100
+        if lastArm != inside and distance <= 0.5:
+            armLog[inside] = armLog.get(inside, 0) + 1
+            lastArm = inside
+
+    right = len(armLog)
+    wrong = sum(v - 1 for v in armLog.values() if v > 1)
+    return right, wrong, armLog
+
+
+def random_sequence(rng, centers, n_frames=80):
+    boxes, labels = [], []
+    for _ in range(n_frames):
+        roll = rng.random()
+        if roll < 0.1:
+            boxes.append(())
+        else:
+            if roll < 0.7:
+                cx, cy = rng.choice(centers)
+                cx, cy = rng.gauss(cx, 40), rng.gauss(cy, 40)
+            else:
+                cx, cy = rng.uniform(0, SHAPE[1]), rng.uniform(0, SHAPE[0])
+            bw, bh = rng.randint(10, 60), rng.randint(10, 60)
+            boxes.append((int(cx - bw / 2), int(cy - bh / 2), int(cx + bw / 2), int(cy + bh / 2)))
+        labels.append(1 if rng.random() < 0.8 else 0)
+    return boxes, labels
+
+
+def test_matches_the_legacy_arm_loop():
+    rng = random.Random(0)
+    centers = ArmVisitTracker(DEFAULT_MASKS, SHAPE).centers
+    for _ in range(200):
+        boxes, labels = random_sequence(rng, centers)
+        tracker = ArmVisitTracker(DEFAULT_MASKS, SHAPE)
+        for frameIdx, (box, label) in enumerate(zip(boxes, labels)):
+            tracker.consume(frameIdx, box, label)
+
+        right, wrong, armLog = legacy_counts(boxes, labels, DEFAULT_MASKS, SHAPE)
+        assert (tracker.right, tracker.wrong) == (right, wrong)
+        assert tracker.arm_log == armLog
+
+
+def test_score_trace_round_trip(tmp_path):
+    rng = random.Random(1)
+    centers = ArmVisitTracker(DEFAULT_MASKS, SHAPE).centers
+    boxes, labels = random_sequence(rng, centers, n_frames=300)
+    trace = DetectionTrace(len(boxes), 10, SHAPE)
+    for frameIdx, (box, label) in enumerate(zip(boxes, labels)):
+        trace.set_detection(frameIdx, box, [])
+        if box:
+            trace.set_label(frameIdx, label, (1 - label, label))
+    path = str(tmp_path / "trace.npz")
+    trace.finalize().save(path)
+
+    scored = score_trace(DetectionTrace.load(path), DEFAULT_MASKS).summary()
+    right, wrong, _ = legacy_counts(boxes, labels, DEFAULT_MASKS, SHAPE)
+    assert (scored["right"], scored["wrong"]) == (right, wrong)
+    assert scored == score_trace(trace, DEFAULT_MASKS).summary()
+    assert scored["entries"] == right + wrong
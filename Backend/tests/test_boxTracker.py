@@ -0,0 +1,44 @@
+import random
+
+import cv2
+import numpy as np
+
+from boxTracker import BoxTracker
+from movementDetector import movementDetectionModel
+
+SHAPE = (360, 640)
+
+
+def test_search_window_is_grid_aligned():
+    rng = random.Random(0)
+    h, w = SHAPE
+    for _ in range(500):
+        grid_size = rng.choice([8, 10, 20])
+        tracker = BoxTracker()
+        tracker.state = (rng.uniform(-50, w + 50), rng.uniform(-50, h + 50), rng.uniform(-30, 30), rng.uniform(-30, 30), rng.randint(10, 80), rng.randint(10, 80))
+        window = tracker.search_window(SHAPE, grid_size)
+        if window is None:
+            continue
+        x0, y0, x1, y1 = window
+        assert x0 % grid_size == 0 and y0 % grid_size == 0
+        assert x1 % grid_size == 0 or x1 == w
+        assert y1 % grid_size == 0 or y1 == h
+        assert 0 <= x0 < x1 <= w and 0 <= y0 < y1 <= h
+
+
+def test_windowed_scan_matches_full_scan():
+    md = movementDetectionModel(None)
+    prev = np.full(SHAPE + (3,), 200, dtype=np.uint8)
+    curr = prev.copy()
+    cv2.circle(prev, (300, 170), 20, (0, 0, 0), -1)
+    cv2.circle(curr, (313, 177), 20, (0, 0, 0), -1)
+
+    tracker = BoxTracker()
+    tracker.update((283, 153, 317, 187))
+    tracker.update((290, 155, 326, 195))
+    window = tracker.search_window(SHAPE, 10)
+    assert window != (0, 0, SHAPE[1], SHAPE[0])
+
+    full = md.detect_movement(prev, curr, grid_size=10, threshold=80)
+    windowed = md.detect_movement(prev, curr, grid_size=10, threshold=80, window=window)
+    assert full[1] and full == windowed
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from RAM_Analysis import RAM_Analysis
+from analysisConfig import AnalysisConfig
+from movementDetector import movementDetectionModel
+from resultCache import ResultCache
+from benchmark import SyntheticMaze, DEFAULT_MASKS, DEFAULT_SCRIPT, same_trace
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "merged_classification.csv")
+
+
+@pytest.fixture(scope="module")
+def setup(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("chunked")
+    config = AnalysisConfig(n_trees=5, max_depth=6)
+    ra = RAM_Analysis(DATASET, output_dir=str(tmp / "output"), cache_dir=str(tmp / "cache"), config=config)
+    video = str(tmp / "maze.mp4")
+    SyntheticMaze(ra, DEFAULT_MASKS, 640, 360, seed=1).write(video, 120, DEFAULT_SCRIPT, config.frame_gap)
+    return ra, video, tmp
+
+
+@pytest.mark.parametrize("tracking", [True, False])
+def test_chunked_trace_matches_sequential(setup, tracking):
+    ra, video, _ = setup
+    config = ra.config.for_job({"tracking": tracking})
+    md = movementDetectionModel(video, frame_gap=config.frame_gap, brightness=config.brightness)
+
+    sequential = ra.detect_video(md, config)
+    chunked = ra.detect_chunked(video, config, n_workers=4)
+    assert len(chunked) == len(sequential) == 119
+    assert same_trace(sequential, chunked)
+
+
+def test_chunked_render_matches_sequential(setup):
+    ra, video, tmp = setup
+    memory = ra.process_video(video, DEFAULT_MASKS, pipeline="memory")
+    # fresh cache so the chunked run detects and renders again
+    ra.cache = ResultCache(str(tmp / "cache_chunked"), ra.output_dir)
+    chunked = ra.process_video(video, DEFAULT_MASKS, pipeline="chunked")
+    for key in ("right", "wrong", "visits", "frames"):
+        assert chunked[key] == memory[key]
@@ -0,0 +1,12 @@
+from metrics import Metrics
+
+
+def test_stage_timers_land_in_the_frame_record():
+    metrics = Metrics()
+    metrics.begin_frame(stage="render", frame=0)
+    with metrics.timer("arm_lookup"):
+        pass
+    record = metrics.end_frame("render")
+
+    assert "arm_lookup" in record and record["seconds"] >= record["arm_lookup"]
+    assert ("frame_seconds", (("stage", "render"),)) in metrics.histograms
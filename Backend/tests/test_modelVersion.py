@@ -0,0 +1,57 @@
+import os
+
+import randomForest
+from randomForest import NoiseFilter
+from resultCache import ResultCache
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "merged_classification.csv")
+
+
+def train(n_trees=5, max_depth=6):
+    nf = NoiseFilter(DATASET, n_trees=n_trees, max_depth=max_depth)
+    nf.train()
+    return nf
+
+
+def test_retrain_invalidates_trace_key(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), str(tmp_path / "output"))
+    params = {"grid_size": 10, "threshold": 80}
+
+    first, second = train(), train()
+    assert first.data_version == second.data_version
+    assert first.version != second.version
+    assert cache.trace_key("video", params, first.version) != cache.trace_key("video", params, second.version)
+
+
+def test_saved_model_keeps_its_version(tmp_path, monkeypatch):
+    nf = train()
+    path = str(tmp_path / "model.pkl")
+    nf.save(path)
+
+    # a valid pickle is checked against the CSV's digest without parsing it
+    def unexpected(csv_path):
+        raise AssertionError(f"{csv_path} was parsed")
+    monkeypatch.setattr(randomForest, "read_labeled_boxes", unexpected)
+
+    loaded = NoiseFilter.load_or_train(DATASET, path, n_trees=5, max_depth=6)
+    assert loaded.version == nf.version
+
+
+def test_update_is_saved_and_reproducible(tmp_path):
+    extra = tmp_path / "extra.csv"
+    extra.write_text("min_x,min_y,max_x,max_y,frame,label\n700,320,730,340,0,1\n900,140,960,220,1,0\n")
+    path = str(tmp_path / "model.pkl")
+    nf = train()
+    nf.save(path)
+
+    loaded = NoiseFilter.load_or_train(DATASET, path, n_trees=5, max_depth=6)
+    loaded.update(str(extra), n_new_trees=2)
+
+    # the next start picks up the updated forest instead of the base pickle
+    reloaded = NoiseFilter.load_or_train(DATASET, path, n_trees=5, max_depth=6)
+    assert reloaded.version == loaded.version != nf.version
+
+    # a fresh build from the same files has the same data version
+    fresh = NoiseFilter(DATASET, n_trees=5, max_depth=6)
+    fresh.append(str(extra))
+    assert fresh.data_version == reloaded.data_version
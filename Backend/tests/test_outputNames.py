@@ -0,0 +1,30 @@
+import os
+
+import pytest
+
+from RAM_Analysis import RAM_Analysis
+from analysisConfig import AnalysisConfig
+from benchmark import SyntheticMaze, DEFAULT_MASKS, DEFAULT_SCRIPT
+
+DATASET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "merged_classification.csv")
+
+
+@pytest.fixture(scope="module")
+def setup(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("outputs")
+    config = AnalysisConfig(n_trees=5, max_depth=6)
+    ra = RAM_Analysis(DATASET, output_dir=str(tmp / "output"), cache_dir=str(tmp / "cache"), config=config)
+    video = str(tmp / "maze.mp4")
+    SyntheticMaze(ra, DEFAULT_MASKS, 640, 360, seed=1).write(video, 120, DEFAULT_SCRIPT, config.frame_gap)
+    return ra, video
+
+
+def test_jobs_never_share_an_output_file(setup):
+    ra, video = setup
+    # back to back, usually within the same second
+    first = ra.process_video(video, DEFAULT_MASKS, job_id="first")
+    second = ra.process_video(video, DEFAULT_MASKS[:4], job_id="second")
+
+    assert (first["video"], second["video"]) == ("first.webm", "second.webm")
+    assert os.path.exists(os.path.join(ra.output_dir, first["video"]))
+    assert ra.catalog.count() == 2
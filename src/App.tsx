@@ -4,6 +4,16 @@ import type { CanvasMaskRef } from "./drawingCanvas";
 import "./App.css";
 import axios from "axios";
 
+const API_URL = "https://api.rosblok.shop";
+const PAGE_SIZE = 50;
+
+type OutputItem = {
+  path: string;
+  stream: string;
+  poster: string;
+  preview: string;
+};
+
 function App() {
   const canvasRef = useRef<CanvasMaskRef>(null);
 
@@ -13,7 +23,11 @@ function App() {
   const [progress, setProgress] = useState(0);
 
   const [videoProgress, setVideoProgress] = useState(-1);
-  const [outputPath, setOutputPath] = useState([]);
+  const [outputPath, setOutputPath] = useState<OutputItem[]>([]);
+  const [outputTotal, setOutputTotal] = useState(0);
+  const [page, setPage] = useState(0);
+  // read by the polling interval, which is set up once
+  const pageRef = useRef(0);
   // ⭐ NEW: brightness slider state
   const [brightness, setBrightness] = useState(100);
   // const [contrast, setContrast] = useState(100);
@@ -72,9 +86,12 @@ function App() {
 
   const fetchOutputPath = async () => {
     try {
-      const res = await fetch("https://api.rosblok.shop/getOutputPath");
+      const offset = pageRef.current * PAGE_SIZE;
+      const res = await fetch(`${API_URL}/getOutputPath?offset=${offset}&limit=${PAGE_SIZE}`);
+      if (!res.ok) return;
       const data = await res.json();
-      setOutputPath(data.paths);
+      setOutputPath(data.items);
+      setOutputTotal(data.total);
     } catch (error) {
       console.error("Error fetching output path:", error);
     }
@@ -148,6 +165,12 @@ function App() {
     video.onseeked = () => drawFirstFrame(video);
   };
 
+  const changePage = (next: number) => {
+    pageRef.current = next;
+    setPage(next);
+    fetchOutputPath();
+  };
+
   const getYoloCoor = () => {
     if (canvasRef.current) {
       return canvasRef.current.getYoloText();
@@ -197,10 +220,31 @@ function App() {
 
       {videoProgress > -1 && <p>Progress: {videoProgress}%</p>}
 
+      {outputTotal > PAGE_SIZE && (
+        <div>
+          <button disabled={page === 0} onClick={() => changePage(page - 1)}>
+            Newer
+          </button>
+          <span style={{ margin: "0 10px" }}>
+            {page * PAGE_SIZE + 1}-{Math.min((page + 1) * PAGE_SIZE, outputTotal)} of {outputTotal}
+          </span>
+          <button disabled={(page + 1) * PAGE_SIZE >= outputTotal} onClick={() => changePage(page + 1)}>
+            Older
+          </button>
+        </div>
+      )}
+
       <div>
-        {outputPath.map((path, index) => (
-          <video key={index} controls width="400" style={{ margin: "10px" }}>
-            <source src={path} type="video/mp4" />
+        {outputPath.map((item) => (
+          <video
+            key={item.path}
+            controls
+            preload="none"
+            poster={`${API_URL}${item.poster}`}
+            width="400"
+            style={{ margin: "10px" }}
+          >
+            <source src={`${API_URL}${item.stream}`} type="video/webm" />
           </video>
         ))}
       </div>